@@ -1,7 +1,7 @@
 import os
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
+import lammps_log
 plt.rcParams.update({
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -16,21 +16,8 @@ tick_params = {'direction': 'in', 'width': 2, 'length': 6}
 
 
 def read_log_file(filename):
-    data_lines = []
-    header = None
-    with open(filename, 'r') as f:
-        for line in f:
-            line_strip = line.strip()
-            if not line_strip or line_strip.startswith("==>"):
-                continue
-            if header is None and line_strip.split()[0][0].isalpha():
-                header = line_strip
-                data_lines.append(header)
-            else:
-                data_lines.append(line_strip)
-    from io import StringIO
-    data_str = "\n".join(data_lines)
-    df = pd.read_csv(StringIO(data_str), sep='\s+')
+    # 所有 thermo 區塊（v_simTime/Step 標頭到 Loop time）依標頭名稱解析
+    df = lammps_log.read_thermo(filename)
     if df.isnull().values.any():
         print(f"Warning: NaN values found in {filename}. They will be filled with 0.")
         df.fillna(0, inplace=True)
@@ -38,7 +25,6 @@ def read_log_file(filename):
 
 
 def process_and_plot_individual_logs(file_list):
-    cumulative_offset = 0
     for file in file_list:
         try:
             df = read_log_file(file)
@@ -49,9 +35,8 @@ def process_and_plot_individual_logs(file_list):
             df.to_csv(individual_csv, index=False)
             print(f"Individual log data saved to {individual_csv}")
 
-            # Calculate breakpoints
-            breakpoints = [cumulative_offset + 2540]
-            cumulative_offset += df['Step'].max()
+            # 階段分界（Dt 改變、Elapsed/v_simTime 歸零處）
+            breakpoints = lammps_log.stage_positions(df, 'Step')
 
             fig, ax1 = plt.subplots(figsize=(8,6))
             ax1.plot(df['Step'], df['c_sys'],    color='green',    label='Whole  System Temp', linewidth=3)
@@ -86,24 +71,13 @@ def process_and_plot_individual_logs(file_list):
 
 
 def combine_and_plot_all_logs(file_list):
-    df_list = []
-    cumulative_offset = 0
-    for file in file_list:
-        try:
-            df = read_log_file(file)
-            if 'v_simTime' not in df.columns:
-                print(f"File {file} does not contain 'v_simTime' column. Skipping.")
-                continue
-            df['Step'] += cumulative_offset
-            cumulative_offset = df['Step'].max()
-            df_list.append(df)
-        except Exception as e:
-            print(f"Error processing {file}: {e}")
+    # Step 接續前一個檔案的最大 Step；source_file 以類別碼標示來源
+    df_all = lammps_log.concat_logs(file_list, "Step", require="v_simTime", read=read_log_file)
 
-    if df_list:
-        df_all = pd.concat(df_list, ignore_index=True)
+    if not df_all.empty:
         combined_csv = "data-combined_data.csv"
-        df_all.to_csv(combined_csv, index=False)
+        # source_file 只供程式內使用，CSV 維持原本的欄位
+        df_all.drop(columns="source_file").to_csv(combined_csv, index=False)
         print(f"Combined log data saved to {combined_csv}")
 
         # Plotting combined data
@@ -4,7 +4,7 @@
 # 追蹤 PKA 的動能/勢能變化，可選擇是否將時間重置為 0
 
 import matplotlib.pyplot as plt
-import numpy as np
+import lammps_dump
 plt.rcParams.update({
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -27,32 +27,14 @@ def read_energy_dump(filename, timestep_fs=0.01, reset_time=False):
     返回:
       time_ps (ps), ke (eV), pe (eV)
     """
-    with open(filename, 'r') as f:
-        lines = f.readlines()
+    # 每帧只读 ATOMS 块第一行（PKA），动能/势能按表头名称 c_ke*/c_pe* 取
+    pka = lammps_dump.read_pka_trajectory(filename, timestep_fs)
 
-    timesteps = []
-    ke = []
-    pe = []
-    i = 0
-    while i < len(lines):
-        if lines[i].startswith("ITEM: TIMESTEP"):
-            step = int(lines[i+1].strip())
-            timesteps.append(step)
-            # 找到下一个 ATOMS 块
-            while not lines[i].startswith("ITEM: ATOMS"):
-                i += 1
-            # 取 ATOMS 块里第一行（PKA）里的动能和势能
-            atom_line = lines[i+1].split()
-            ke.append(float(atom_line[5]))
-            pe.append(float(atom_line[6]))
-        i += 1
-
-    timesteps = np.array(timesteps)
-    time_ps = timesteps * timestep_fs * 0.001  # 转为 ps
+    time_ps = pka["time"]  # 已转为 ps
     if reset_time:
         time_ps = time_ps - time_ps[0]
 
-    return time_ps, np.array(ke), np.array(pe)
+    return time_ps, pka["ke"], pka["pe"]
 
 if __name__ == "__main__":
     # 例：从 dump.PKA.init 读取，重置时间为 0
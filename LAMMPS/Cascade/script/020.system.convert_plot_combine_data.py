@@ -2,6 +2,7 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np  
+import lammps_log
 plt.rcParams.update({
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -19,6 +20,10 @@ print(data.head())
 
 data.columns = data.columns.str.strip()
 
+# 階段分界：由 Dt 改變、Elapsed/v_simTime 歸零、source_file 改變自動偵測
+stage_steps = lammps_log.stage_positions(data, "Step")
+print(f"stage boundaries at Step {stage_steps.tolist()}")
+
 fig, ax1 = plt.subplots(figsize=(8,6))
 
 ax1.plot(data['Step'], data['Temp'],    color='red',    label='System Temp',   linewidth=2.0)
@@ -26,10 +31,8 @@ ax1.plot(data['Step'], data['Temp'],    color='red',    label='System Temp',   l
 ax1.plot(data['Step'], data['c_in'],    color='green',  label='Internal Temp', linewidth=1.5)
 #ax1.plot(data['Step'], data['c_PKAin'], color='purple',    label='PKA Temp',      linewidth=1.5, linestyle=':')
 
-plt.axvline(x=12544, color='grey', linestyle='dashdot', linewidth=1)
-plt.axvline(x=22544, color='grey', linestyle='dashdot', linewidth=1)
-plt.axvline(x=42544, color='grey', linestyle='dashdot', linewidth=1)
-plt.axvline(x=62544, color='grey', linestyle='dashdot', linewidth=1)
+for x in stage_steps:
+    plt.axvline(x=x, color='grey', linestyle='dashdot', linewidth=1)
 
 ax1.set_xlabel('Step')
 ax1.set_ylabel('Temp')
@@ -51,10 +54,8 @@ plt.figure(figsize=(8,6))
 plt.plot(data['Step'], data['PotEng'], label="Potential Energy", color="red", linewidth=2)
 plt.plot(data['Step'], data['TotEng'], label="Total Energy",    color="blue", linewidth=2)
 plt.xlim(data['Step'].min(), data['Step'].max())
-plt.axvline(x=12544, color='grey', linestyle='dashdot', linewidth=1)
-plt.axvline(x=22544, color='grey', linestyle='dashdot', linewidth=1)
-plt.axvline(x=42544, color='grey', linestyle='dashdot', linewidth=1)
-plt.axvline(x=62544, color='grey', linestyle='dashdot', linewidth=1)
+for x in stage_steps:
+    plt.axvline(x=x, color='grey', linestyle='dashdot', linewidth=1)
 
 plt.legend()
 plt.savefig("fig-sys-Energy-Evolution.pdf", dpi=1200,transparent=True)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
+import os
 import matplotlib.pyplot as plt
 import numpy as np
+import lammps_log
+import lammps_dump
 plt.rcParams.update({
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -14,47 +17,33 @@ plt.rcParams.update({
 tick_params = {'direction': 'in', 'width': 2, 'length': 6}
 
 def read_energy_dump(filename, average=False):
-    with open(filename, 'r') as f:
-        lines = f.readlines()
+    cols = lammps_dump.dump_columns(filename)
+    # 動能/勢能按表頭名稱取 (c_keInt / c_peInt)，不依賴欄位順序
+    ke_col = lammps_dump.find_column(cols, "c_ke")
+    pe_col = lammps_dump.find_column(cols, "c_pe")
+    idx = lammps_dump.frame_table(filename, [ke_col, pe_col])
 
-    timesteps = []
     ke_list = []
     pe_list = []
-    i = 0
-    while i < len(lines):
-        if lines[i].startswith("ITEM: TIMESTEP"):
-            timestep = int(lines[i + 1].strip())
-            timesteps.append(timestep)
-            i += 2
-            while not lines[i].startswith("ITEM: ATOMS"):
-                i += 1
-            i += 1  # move to first atom line
+    for _, _, (ke, pe) in lammps_dump.iter_frames(filename, [ke_col, pe_col]):
+        ke_total = ke.sum()
+        pe_total = pe.sum()
+        if average and len(ke) > 0:
+            ke_total /= len(ke)
+            pe_total /= len(pe)
 
-            ke_total = 0.0
-            pe_total = 0.0
-            atom_count = 0
-            while i < len(lines) and not lines[i].startswith("ITEM:"):
-                parts = lines[i].split()
-                # 注意：parts[6] 是動能，parts[5] 是勢能
-                ke_total += float(parts[6])
-                pe_total += float(parts[5])
-                atom_count += 1
-                i += 1
+        ke_list.append(ke_total)
+        pe_list.append(pe_total)
 
-            if average and atom_count > 0:
-                ke_total /= atom_count
-                pe_total /= atom_count
-
-            ke_list.append(ke_total)
-            pe_list.append(pe_total)
-        else:
-            i += 1
-
-    return np.array(timesteps), np.array(ke_list), np.array(pe_list)
+    return idx["step"], np.array(ke_list), np.array(pe_list)
 
 # 讀檔
+LOG_FILE = "log.lammps"   # 同一次模擬的 thermo log，用來偵測階段分界
 time_steps, ke, pe = read_energy_dump("dump.sum.init-peak", average=True)
 
+stage_steps = lammps_log.stage_positions(lammps_log.read_thermo(LOG_FILE), "Step") \
+    if os.path.exists(LOG_FILE) else []
+
 # 開一張圖
 fig, ax1 = plt.subplots(figsize=(8, 5))
 
@@ -64,8 +53,8 @@ ax1.set_xlabel('Timestep')
 ax1.set_ylabel('Per Atom Kinetic Energy (eV)', color='r')
 ax1.tick_params(axis='y', labelcolor='r')
 
-## 畫一些階段分界線（可選）
-for x in [42600]:
+## 階段分界線：有 log.lammps 時由 thermo 資料自動偵測
+for x in stage_steps:
     ax1.axvline(x=x, color='grey', linestyle='dashdot', linewidth=1)
 
 # 右側 y 軸：勢能
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
+import os
 import matplotlib.pyplot as plt
 import numpy as np
+import lammps_log
 plt.rcParams.update({
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -53,8 +55,12 @@ def read_energy_dump(filename, average=False):
     return np.array(timesteps), np.array(ke_list), np.array(pe_list)
 
 # 讀檔
+LOG_FILE = "log.lammps"   # 同一次模擬的 thermo log，用來偵測階段分界
 time_steps, ke, pe = read_energy_dump("dump.init", average=True)
 
+stage_steps = lammps_log.stage_positions(lammps_log.read_thermo(LOG_FILE), "Step") \
+    if os.path.exists(LOG_FILE) else []
+
 # 開一張圖
 fig, ax1 = plt.subplots(figsize=(8, 5))
 
@@ -64,8 +70,8 @@ ax1.set_xlabel('Timestep')
 ax1.set_ylabel('Per Atom Kinetic Energy (eV)', color='r')
 ax1.tick_params(axis='y', labelcolor='r')
 
-## 畫一些階段分界線（可選）
-for x in [42600]:
+## 階段分界線：有 log.lammps 時由 thermo 資料自動偵測
+for x in stage_steps:
     ax1.axvline(x=x, color='grey', linestyle='dashdot', linewidth=1)
 
 # 右側 y 軸：勢能
@@ -1,30 +1,13 @@
 #!/usr/bin/env python3
-import os
-import pandas as pd
+import lammps_log
 
 def read_log_file(filename):
     """
-    Read a single LAMMPS log file.
-    Skips lines starting with '==>' and blank lines.
-    The first non-comment line (starting with a letter) is assumed to be the header.
+    Read a single LAMMPS log file (or a thermo table cut out of one).
+    Every thermo block (v_simTime/Step header to "Loop time") is parsed by
+    header name; '==>' lines, blank lines and warnings are skipped.
     """
-    data_lines = []
-    header = None
-    with open(filename, 'r') as f:
-        for line in f:
-            line_strip = line.strip()
-            if not line_strip or line_strip.startswith("==>"):
-                continue
-            # Treat the first line starting with an alphabet as the header.
-            if header is None and line_strip.split()[0][0].isalpha():
-                header = line_strip
-                data_lines.append(header)
-            else:
-                data_lines.append(line_strip)
-    from io import StringIO
-    data_str = "\n".join(data_lines)
-    df = pd.read_csv(StringIO(data_str), delim_whitespace=True)
-    return df
+    return lammps_log.read_thermo(filename)
 
 def combine_log_files_with_offset(file_list):
     """
@@ -32,29 +15,19 @@ def combine_log_files_with_offset(file_list):
     For each file, compute a new column "convert_simTime" 
     as the cumulative offset of the original v_simTime.
     The original v_simTime remains unchanged.
-    Also add a 'source_file' column for later identification.
+    Also add a 'source_file' column (categorical) for later identification.
     """
-    cumulative_offset = 0.0
-    df_list = []
-    for file in file_list:
-        try:
-            df = read_log_file(file)
-            if 'v_simTime' not in df.columns:
-                print(f"File {file} does not contain 'v_simTime' column. Skipping.")
-                continue
-            # 計算新的時間欄位 convert_simTime = v_simTime + cumulative_offset
-            df["convert_simTime"] = df["v_simTime"] + cumulative_offset
-            # 更新 cumulative_offset 使用剛剛計算出的 convert_simTime 中的最大值
-            cumulative_offset = df["convert_simTime"].max()
-            df["source_file"] = os.path.basename(file)
-            df_list.append(df)
-            print(f"Read {file}: new convert_simTime range: {df['convert_simTime'].min()} - {df['convert_simTime'].max()}")
-        except Exception as e:
-            print(f"Error reading {file}: {e}")
-    if df_list:
-        df_all = pd.concat(df_list, ignore_index=True, sort=False)
-    else:
-        df_all = pd.DataFrame()
+    # 每個檔案的 convert_simTime = v_simTime + 前面各檔 v_simTime 最大值的累加
+    df_all = lammps_log.concat_logs(file_list, "v_simTime", offset_to="convert_simTime",
+                                    require="v_simTime", read=read_log_file)
+    if df_all.empty:
+        return df_all
+    t = df_all["convert_simTime"].to_numpy()
+    starts = df_all.attrs["starts"]
+    for k, file in enumerate(df_all.attrs["files"]):
+        seg = t[starts[k]:starts[k + 1]]
+        if len(seg):
+            print(f"Read {file}: new convert_simTime range: {seg.min()} - {seg.max()}")
     return df_all
 
 def main():
@@ -3,29 +3,11 @@
 # Parse kinetic & potential energy of PKA over time from LAMMPS dump
 # 追蹤 PKA 的動能/勢能變化
 import matplotlib.pyplot as plt
-import numpy as np
+import lammps_dump
 
 def read_energy_dump(filename, timestep_fs=0.01):
-    with open(filename, 'r') as f:
-        lines = f.readlines()
-
-    timesteps = []
-    ke = []
-    pe = []
-    i = 0
-    while i < len(lines):
-        if lines[i].startswith("ITEM: TIMESTEP"):
-            timestep = int(lines[i + 1].strip())
-            timesteps.append(timestep)
-            while not lines[i].startswith("ITEM: ATOMS"):
-                i += 1
-            atom_line = lines[i + 1].strip().split()
-            ke.append(float(atom_line[5]))
-            pe.append(float(atom_line[6]))
-        i += 1
-
-    time_ps = np.array(timesteps) * timestep_fs * 0.001
-    return time_ps, np.array(ke), np.array(pe)
+    pka = lammps_dump.read_pka_trajectory(filename, timestep_fs)
+    return pka["time"], pka["ke"], pka["pe"]
 
 # Change this to your actual file
 time, ke, pe = read_energy_dump("dump.PKA.final")
@@ -3,23 +3,12 @@
 # Extract and plot MSD of F, Be, Li from LAMMPS log or thermo output
 # 畫出 F、Be、Li 的 MSD 比較圖
 import matplotlib.pyplot as plt
+import lammps_log
 
 def read_thermo_msd(filename):
-    time = []
-    msdF = []
-    msdBe = []
-    msdLi = []
-
-    with open(filename, 'r') as f:
-        for line in f:
-            if line.strip() and not line.startswith("#") and not line.startswith("Step"):
-                parts = line.split()
-                time.append(float(parts[0]))
-                msdF.append(float(parts[-3]))
-                msdBe.append(float(parts[-2]))
-                msdLi.append(float(parts[-1]))
-    
-    return time, msdF, msdBe, msdLi
+    # 第一欄是時間，最後三欄是 v_msdF_total v_msdBe_total v_msdLi_total
+    df = lammps_log.read_thermo(filename)
+    return tuple(df.iloc[:, k].to_numpy() for k in (0, -3, -2, -1))
 
 # Replace with your LAMMPS thermo output that includes msd values
 time, msdF, msdBe, msdLi = read_thermo_msd("log.msd")
@@ -1,12 +1,10 @@
 # python cluster_analysis_simplified.py -p raw-init-peak  -s 10
-import os
-import re
-import glob
 import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
+import ovito_clusters
 
 # Plot style
 plt.rcParams.update({
@@ -38,25 +36,17 @@ def parse_args():
     p.add_argument('-s', '--skip', type=int, default=10, help="Skip interval for frames")
     return p.parse_args()
 
-def read_cluster_file(path, prefix, skip_by):
-    fname = os.path.basename(path)
-    m = re.search(rf"{re.escape(prefix)}[._]?(\d+)", fname)
-    if not m: return None
-    frame = int(m.group(1))
-    if frame % skip_by != 0: return None
-    df = pd.read_csv(
-        path, delim_whitespace=True, comment='#',
-        names=['cluster_id', 'cluster_size', 'com_x', 'com_y', 'com_z',
-               'radius_of_gyration', 'g_XX', 'g_YY', 'g_ZZ', 'g_XY', 'g_XZ', 'g_YZ']
-    )
-    df['frame'] = frame
-    return df
+CLUSTER_COLUMNS = [
+    'cluster_id', 'cluster_size',
+    'com_x', 'com_y', 'com_z',
+    'radius_of_gyration',
+    'g_XX', 'g_YY', 'g_ZZ', 'g_XY', 'g_XZ', 'g_YZ'
+]
 
 def load_all_clusters(folder, prefix, skip_by):
-    pattern = os.path.join(folder, f"{prefix}.*")
-    files = sorted(glob.glob(pattern), key=lambda f: int(re.search(rf"{re.escape(prefix)}[._]?(\d+)", os.path.basename(f)).group(1)))
-    dfs = [read_cluster_file(f, prefix, skip_by) for f in files]
-    return pd.concat([df for df in dfs if df is not None], ignore_index=True) if dfs else pd.DataFrame()
+    """一併載入所有符合條件的 cluster 檔案（經 ovito_clusters 快取）"""
+    _, df = ovito_clusters.load_cluster_table(prefix, folder, names=CLUSTER_COLUMNS)
+    return df[df['frame'] % skip_by == 0].reset_index(drop=True)
 
 def categorize(df):
     def assign_label(size):
@@ -9,15 +9,19 @@ Options:
   -p, --prefix  File prefix to match (default: raw)
   -s, --skip    Skip interval for frames (default: 10)
   -r, --range   Cluster size range to include in heatmap, e.g. 3-5 (default: all sizes)
+  -b, --max-cols  Most heatmap columns (default 200); more frames are summed into
+                equal windows, and only grids up to 60×60 get per-cell numbers
+
+The <prefix>.<frame> files are parsed once into <prefix>.clusters.npz
+(ovito_clusters.py) and reused until a file is added, removed or modified.
 """
-import os
-import re
-import glob
 import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
+import ovito_clusters
+import cluster_hist
 
 # 設置全局畫圖參數
 plt.rcParams.update({
@@ -51,50 +55,30 @@ def parse_args():
         '-r', '--range', dest='size_range', default=None,
         help="Cluster size range to include in heatmap, format min-max, e.g. 3-5"
     )
+    parser.add_argument(
+        '-b', '--max-cols', type=int, default=200,
+        help="Max heatmap columns; frames beyond are binned into windows (0 = no binning)"
+    )
     return parser.parse_args()
 
 
-def read_cluster_file(path, prefix, skip_by):
-    """讀入單個 cluster 檔案，僅當 frame % skip_by == 0 時才返回 DataFrame"""
-    fname = os.path.basename(path)
-    m = re.search(rf"{re.escape(prefix)}[._]?(\d+)", fname)
-    if not m:
-        return None
-    frame = int(m.group(1))
-    if frame % skip_by != 0:
-        return None
-    df = pd.read_csv(
-        path, delim_whitespace=True, comment='#',
-        names=[
-            'cluster_id', 'cluster_size',
-            'com_x', 'com_y', 'com_z',
-            'radius_of_gyration',
-            'g_XX', 'g_YY', 'g_ZZ', 'g_XY', 'g_XZ', 'g_YZ'
-        ]
-    )
-    df['frame'] = frame
-    return df
+CLUSTER_COLUMNS = [
+    'cluster_id', 'cluster_size',
+    'com_x', 'com_y', 'com_z',
+    'radius_of_gyration',
+    'g_XX', 'g_YY', 'g_ZZ', 'g_XY', 'g_XZ', 'g_YZ'
+]
 
 
 def load_all_clusters(folder, prefix, skip_by):
-    """一併載入所有符合條件的 cluster 檔案"""
-    pattern = os.path.join(folder, f"{prefix}.*")
-    files = sorted(
-        glob.glob(pattern),
-        key=lambda f: int(re.search(rf"{re.escape(prefix)}[._]?(\d+)", os.path.basename(f)).group(1))
-    )
-    dfs = []
-    for f in files:
-        df = read_cluster_file(f, prefix, skip_by)
-        if df is not None:
-            dfs.append(df)
-    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
-
-
-def compute_time_series_stats(df, prefix):
-    """計算每個 frame 的 cluster 數量並存成 CSV"""
-    stats = df.groupby('frame').agg({'cluster_id': 'count'}).reset_index()
-    stats.columns = ['frame', 'cluster_count']
+    """一併載入所有符合條件的 cluster 檔案（經 ovito_clusters 快取）"""
+    _, df = ovito_clusters.load_cluster_table(prefix, folder, names=CLUSTER_COLUMNS)
+    return df[df['frame'] % skip_by == 0].reset_index(drop=True)
+
+
+def compute_time_series_stats(hist, prefix):
+    """計算每個 frame 的 cluster 數量並存成 CSV（hist 為 cluster_hist.SizeHistogram）"""
+    stats = pd.DataFrame({'frame': hist.x, 'cluster_count': hist.cluster_count(size_min=0)})
     out_csv = f"cluster_stats_summary_{prefix}.csv"
     stats.to_csv(out_csv, index=False)
     print(f"Saved time series stats: {out_csv}")
@@ -117,45 +101,30 @@ def plot_time_series(stats, prefix):
     plt.close(fig)
 
 
-def plot_cluster_heatmap(df, prefix, size_min=None, size_max=None):
+def plot_cluster_heatmap(hist, prefix, size_min=None, size_max=None, max_cols=200):
     """畫 heatmap，若指定 size_min, size_max 則先過濾"""
-    # 過濾 cluster size
+    # 過濾 cluster size，只留下該範圍內有 cluster 的 frame
     if size_min is not None and size_max is not None:
-        df = df[(df['cluster_size'] >= size_min) & (df['cluster_size'] <= size_max)]
-    if df.empty:
+        sizes, data = hist.matrix(size_min, size_max)
+    else:
+        sizes, data = hist.matrix(0)
+    cols = np.nonzero(data.any(axis=0))[0]
+    if not len(cols):
         print("No clusters in specified size range. Skipping heatmap.")
         return
-    pivot = pd.crosstab(df['cluster_size'], df['frame'])
-    data = pivot.values
-    masked = np.ma.masked_where(data == 0, data)
-
-    nx, ny = pivot.shape[1], pivot.shape[0]
-    X = np.arange(nx + 1)
-    Y = np.arange(ny + 1)
+    data, frames = data[:, cols], hist.x[cols]
 
+    # 幀數多時自動分箱、只在小格子上標值（cluster_hist.draw_size_heatmap）
     fig, ax = plt.subplots()
-    cmap = plt.cm.viridis
-    cmap.set_bad(color='white')
-    pcm = ax.pcolormesh(X, Y, masked, cmap=cmap, shading='flat')
+    pcm, w = cluster_hist.draw_size_heatmap(ax, frames, sizes, data, max_cols)
 
-    ax.set_xlabel('Frame', fontweight='400')
+    ax.set_xlabel('Frame' if w == 1 else f'Frame (start of {w}-frame window)', fontweight='400')
     ax.set_ylabel('Cluster Size', fontweight='400')
-    ax.set_xticks(np.arange(nx) + 0.5)
-    ax.set_xticklabels(pivot.columns, rotation=90)
-    ax.set_yticks(np.arange(ny) + 0.5)
-    ax.set_yticklabels(pivot.index)
 
     cbar = fig.colorbar(pcm, ax=ax)
     cbar.locator = MaxNLocator(integer=True)
     cbar.update_ticks()
-    cbar.set_label('Count', fontweight='400')
-
-    # 在每個 cell 中心標值
-    for i in range(ny):
-        for j in range(nx):
-            val = data[i, j]
-            if val > 0:
-                ax.text(j + 0.5, i + 0.5, str(val), ha='center', va='center', fontsize=8, color='white')
+    cbar.set_label('Count' if w == 1 else f'Count per {w} frames', fontweight='400')
 
     plt.tight_layout()
     rng = f"_{size_min}-{size_max}" if size_min is not None else ''
@@ -179,6 +148,7 @@ if __name__ == "__main__":
     if df_all.empty:
         print(f"No files found with prefix '{args.prefix}.' divisible by skip {args.skip}.")
         exit(1)
-    stats = compute_time_series_stats(df_all, args.prefix)
+    hist = cluster_hist.SizeHistogram.from_table(df_all['frame'], df_all['cluster_size'])
+    stats = compute_time_series_stats(hist, args.prefix)
     plot_time_series(stats, args.prefix)
-    plot_cluster_heatmap(df_all, args.prefix, size_min, size_max)
+    plot_cluster_heatmap(hist, args.prefix, size_min, size_max, args.max_cols)
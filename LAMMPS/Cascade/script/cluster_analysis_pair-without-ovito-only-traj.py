@@ -20,221 +20,408 @@ Arguments:
   --types    Comma‐separated ID:SYMBOL mapping, e.g. 1:F,2:Be,3:Li
   --cutoffs  Comma‐separated SYMBOL1-SYMBOL2:CUTOFF, e.g. Li-Li:3.0,F-Be:2.8
   --skip     Only process every Nth frame (default=1 all frames)
-  --xaxis    “timestep” or “frame” (default “timestep”)
+  --no-pbc   Ignore the periodic box (by default unwrapped coordinates are
+             wrapped with “ITEM: BOX BOUNDS” and neighbours are searched
+             across periodic boundaries)
+  --skin     Verlet skin in Å (default 0 = off).  Candidate pairs within
+             cutoff+skin are reused across consecutive frames and only
+             re-filtered by distance until some atom has moved > skin/2
+  --stages   Instead of --dump, chain per-stage dumps into one trajectory:
+             NAME:FILE:DT_PS,… (e.g. init:dump.init_all:0.00001,peak:dump.peak_all:0.0001)
+             or flibe:GROUP / flibe-new-region:GROUP for the stages of
+             in.FLiBe / in.FLiBe-New-Region (e.g. flibe:all); missing
+             stage dumps are skipped
+  --xaxis    “timestep”, “frame”, or “time” (ps, needs --stages) (default “timestep”)
   --select   Comma‐separated ranges or values of x‐axis to include,
              e.g. 2000-20000 or 200,2000,20000
+  --workers  Number of worker processes; frames are split into contiguous
+             chunks and results merged back in frame order (default=1).
+             Compressed dumps are decompressed once, by the main process,
+             which hands the parsed frames to the workers
+  --follow   Keep the dump open while LAMMPS is still writing it, analyse
+             each newly completed frame and refresh the PDFs every --poll
+             seconds (Ctrl-C to stop)
+  --lineage  PREFIX: track clusters from frame to frame by shared atom ids
+             (cluster_lineage.py) and write PREFIX_events.csv (birth,
+             death, merge, split) and PREFIX_clusters.csv (lifetimes)
+  --export   PREFIX: also write PREFIX.<frame> for every analysed frame in
+             OVITO's cluster-list format (cluster id, size, COM, radius of
+             gyration, gyration tensor; cluster_geometry.py) for the atoms of
+             the --cutoffs types, readable by cluster_analysis-need-ovito-data.py
+             and cluster_stable_pair_detector.py -p
+  --heatmap-cols  Most heatmap columns (default 200); longer runs are summed
+             into equal windows of consecutive frames (0 = one column per frame).
+             Cells are annotated only on grids up to 60×60
+  --hist-out CSV file that receives “x,size,count” for every non-zero cell
+             of the size histogram as soon as each frame is analysed
 
 Outputs:
   - cluster_count_vs_time.pdf
-  - cluster_size_heatmap.pdf (zeros are blank, non-zeros annotated)
+  - cluster_size_heatmap.pdf (zeros are blank, non-zeros annotated on small grids)
+
+Frames are located through the sidecar index written by lammps_dump.py
+(<dump>.idx.npz), so repeat runs with a different --select seek straight
+to the chosen frames.
 
 Dependencies:
-  numpy, scipy, matplotlib
+  numpy, scipy, matplotlib, lammps_dump.py, cluster_lineage.py,
+  cluster_hist.py, cluster_geometry.py (same folder)
 """
 
 import argparse
-from collections import deque, defaultdict
+import collections
+import itertools
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from scipy.spatial import cKDTree
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MaxNLocator
+import lammps_dump
+import cluster_lineage
+import cluster_hist
+import cluster_geometry
 
 def parse_args():
     p = argparse.ArgumentParser(
         description="Analyze atom‐pair clusters; choose x-axis, select subset, annotate heatmap."
     )
-    p.add_argument("--dump",    required=True,
+    p.add_argument("--dump",    default=None,
                    help="LAMMPS dump file with “ITEM: ATOMS …”")
+    p.add_argument("--no-pbc",  dest="pbc", action="store_false",
+                   help="Do not search neighbours across periodic boundaries")
+    p.add_argument("--skin",    type=float, default=0.0,
+                   help="Verlet skin (Å) for neighbour-list reuse across frames (default=0, off)")
+    p.add_argument("--stages",  default=None,
+                   help="Per-stage dumps NAME:FILE:DT_PS,… or LAYOUT:GROUP, LAYOUT one of "
+                        "lammps_dump.STAGE_LAYOUTS (flibe, flibe-new-region) (replaces --dump)")
     p.add_argument("--types",   required=True,
                    help="Mapping of type IDs to symbols, e.g. 1:F,2:Be,3:Li")
     p.add_argument("--cutoffs", required=True,
                    help="Atom‐pair cutoffs, e.g. Li-Li:3.0,F-Be:2.8")
     p.add_argument("--skip",    type=int, default=1,
                    help="Only process every Nth frame (default=1)")
-    p.add_argument("--xaxis",   choices=["timestep","frame"], default="timestep",
-                   help="Use LAMMPS timestep or frame index on x‐axis")
+    p.add_argument("--xaxis",   choices=["timestep","frame","time"], default="timestep",
+                   help="Use LAMMPS timestep, frame index or time in ps (--stages) on x‐axis")
     p.add_argument("--select",  default=None,
                    help="Select only these x‐values, e.g. 2000-20000,200,5000")
-    return p.parse_args()
-
-def parse_types(txt):
-    sym2id = {}
-    for item in txt.split(","):
-        tid, sym = item.split(":")
-        sym2id[sym] = int(tid)
-    return sym2id
-
-def parse_cutoffs(txt):
-    out = []
-    for item in txt.split(","):
-        pair, d = item.split(":")
-        a,b = pair.split("-")
-        out.append((a, b, float(d)))
-    return out
+    p.add_argument("--workers", type=int, default=1,
+                   help="Worker processes for frame-parallel analysis (default=1)")
+    p.add_argument("--follow",  action="store_true",
+                   help="Follow a dump that is still being written")
+    p.add_argument("--lineage", default=None, metavar="PREFIX",
+                   help="Write PREFIX_events.csv / PREFIX_clusters.csv cluster lineage tables")
+    p.add_argument("--export", default=None, metavar="PREFIX",
+                   help="Write PREFIX.<frame> cluster lists (COM, Rg, gyration tensor) in OVITO format")
+    p.add_argument("--heatmap-cols", type=int, default=200,
+                   help="Max heatmap columns; frames beyond are binned into windows (0 = no binning)")
+    p.add_argument("--hist-out", default=None, metavar="CSV",
+                   help="Stream the cluster-size histogram to CSV (x,size,count)")
+    p.add_argument("--poll",    type=float, default=60.0,
+                   help="Seconds between checks for new frames with --follow (default=60)")
+    args = p.parse_args()
+    if (args.dump is None) == (args.stages is None):
+        p.error("give exactly one of --dump or --stages")
+    if args.xaxis == "time" and not args.stages:
+        p.error("--xaxis time needs --stages (per-stage timesteps)")
+    if args.follow and args.stages:
+        p.error("--follow works on a single --dump")
+    return args
 
 def parse_select(txt):
     """Parse select string into list of (start,end) tuples."""
+    num = lambda v: float(v) if "." in v else int(v)
     ranges = []
     for seg in txt.split(","):
         if "-" in seg:
             a,b = seg.split("-")
-            ranges.append((int(a), int(b)))
+            ranges.append((num(a), num(b)))
         else:
-            v = int(seg)
+            v = num(seg)
             ranges.append((v, v))
     return ranges
 
-def in_selection(x, ranges):
-    return any(a <= x <= b for a,b in ranges)
+def pairs_to_adjacency(rows, cols, N):
+    """Sparse N×N adjacency matrix (CSR) from an edge list."""
+    return coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                      shape=(N, N)).tocsr()
+
+def build_adjacency(types, coords, cutoffs, sym2id, boxsize=None):
+    """Sparse N×N adjacency matrix (CSR) holding every pair within its cutoff."""
+    rows, cols, _ = cluster_geometry.find_pairs(types, coords, cutoffs, sym2id, boxsize)
+    return pairs_to_adjacency(rows, cols, len(types))
 
-def parse_lammps_dump(fname):
+def find_clusters(adj):
+    """Cluster label of every atom (connected components of adj)."""
+    _, labels = connected_components(adj, directed=False)
+    return labels
+
+def cluster_labels(types, coords, cutoffs, sym2id, pbc=None):
     """
-    Yield list of (step, types_array, coords_array) for each frame in the dump.
-    Detects column order by header labels.
+    Cluster label of every atom in one frame; pbc is the (lo, boxsize)
+    of lammps_dump.periodic_box, or None for an open box.
     """
-    frames = []
-    with open(fname) as f:
-        while True:
-            line = f.readline()
-            if not line: break
-            if line.startswith("ITEM: TIMESTEP"):
-                step = int(f.readline().strip())
-                # skip to ATOMS header
-                while True:
-                    line = f.readline()
-                    if not line: return frames
-                    if line.startswith("ITEM: ATOMS"):
-                        cols = line.strip().split()[2:]
-                        idx = {name:i for i,name in enumerate(cols)}
-                        i_type = idx["type"]
-                        i_x    = idx["xu"]
-                        i_y    = idx["yu"]
-                        i_z    = idx["zu"]
-                        break
-                types, coords = [], []
-                while True:
-                    pos = f.tell()
-                    line = f.readline()
-                    if not line or line.startswith("ITEM:"):
-                        f.seek(pos)
-                        break
-                    parts = line.split()
-                    types.append(int(parts[i_type]))
-                    coords.append((float(parts[i_x]),
-                                   float(parts[i_y]),
-                                   float(parts[i_z])))
-                frames.append((step,
-                               np.array(types, dtype=int),
-                               np.array(coords, dtype=float)))
-    return frames
-
-def build_adjacency(types, coords, cutoffs, sym2id):
-    N = len(types)
-    adj = {i:set() for i in range(N)}
-    for symA, symB, cutoff in cutoffs:
-        idA, idB = sym2id[symA], sym2id[symB]
-        idxA = np.nonzero(types==idA)[0]
-        idxB = np.nonzero(types==idB)[0]
-        if len(idxA)==0 or len(idxB)==0: continue
-        ptsA, ptsB = coords[idxA], coords[idxB]
-        if idA==idB:
-            tree = cKDTree(ptsA)
-            for i,j in tree.query_pairs(r=cutoff):
-                u,v = idxA[i], idxA[j]
-                adj[u].add(v); adj[v].add(u)
-        else:
-            treeB = cKDTree(ptsB)
-            for i,pa in enumerate(ptsA):
-                u = idxA[i]
-                for j in treeB.query_ball_point(pa, cutoff):
-                    v = idxB[j]
-                    adj[u].add(v); adj[v].add(u)
-    return adj
+    boxsize = None
+    if pbc is not None:
+        lo, boxsize = pbc
+        coords = lammps_dump.wrap_positions(coords, lo, boxsize)
+    return find_clusters(build_adjacency(types, coords, cutoffs, sym2id, boxsize))
 
-def find_clusters(adj):
-    visited, clusters = set(), []
-    for i in adj:
-        if i not in visited:
-            comp, queue = [], deque([i])
-            visited.add(i)
-            while queue:
-                u = queue.popleft()
-                comp.append(u)
-                for v in adj[u]:
-                    if v not in visited:
-                        visited.add(v)
-                        queue.append(v)
-            clusters.append(comp)
-    return clusters
+def cluster_sizes(types, coords, cutoffs, sym2id, pbc=None):
+    """Sizes of all clusters with ≥2 atoms in one frame."""
+    sizes = np.bincount(cluster_labels(types, coords, cutoffs, sym2id, pbc))
+    return sizes[sizes>=2]
+
+class VerletPairs:
+    """
+    --skin: keep the candidate pairs within cutoff+skin between frames and
+    only re-filter them by the current distance; the KD-trees are rebuilt
+    once some atom has moved more than skin/2 since the last build (or the
+    atom ids or box changed).  Frames are put in id order so that rows
+    line up from one frame to the next.
+    """
+    def __init__(self, cutoffs, sym2id, skin):
+        self.cutoffs, self.sym2id, self.skin = cutoffs, sym2id, skin
+        self.ref = self.ids = self.boxsize = None
+        self.rebuilds = 0
+
+    def _stale(self, ids, coords, boxsize):
+        if self.ref is None or len(ids) != len(self.ids) or (ids != self.ids).any():
+            return True
+        if (boxsize is None) != (self.boxsize is None) or \
+           (boxsize is not None and not np.array_equal(boxsize, self.boxsize)):
+            return True
+        d = cluster_geometry.minimum_image(coords - self.ref, boxsize)
+        return np.einsum("ij,ij->i", d, d).max(initial=0.0) > (self.skin/2)**2
+
+    def cluster_labels(self, ids, types, coords, pbc=None):
+        """(id order of the rows, their cluster labels), reusing the neighbour list."""
+        order = np.argsort(ids, kind="stable")
+        ids, types, coords = ids[order], types[order], np.asarray(coords[order], float)
+        boxsize = None if pbc is None else pbc[1]
+        if self._stale(ids, coords, boxsize):
+            x = coords if pbc is None else lammps_dump.wrap_positions(coords, *pbc)
+            self.i, self.j, self.cut = cluster_geometry.find_pairs(types, x, self.cutoffs, self.sym2id,
+                                                  boxsize, self.skin)
+            self.ref, self.ids, self.boxsize = coords.copy(), ids.copy(), boxsize
+            self.rebuilds += 1
+        d = cluster_geometry.minimum_image(coords[self.j] - coords[self.i], boxsize)
+        keep = np.einsum("ij,ij->i", d, d) <= self.cut**2
+        adj = pairs_to_adjacency(self.i[keep], self.j[keep], len(ids))
+        return order, find_clusters(adj)
+
+    def cluster_sizes(self, ids, types, coords, pbc=None):
+        """Same result as cluster_sizes(), reusing the neighbour list."""
+        sizes = np.bincount(self.cluster_labels(ids, types, coords, pbc)[1])
+        return sizes[sizes>=2]
+
+def export_clusters(fname, types, coords, labels, cutoffs, sym2id, pbc):
+    """--export: cluster list of the --cutoffs atom types in OVITO's format."""
+    sel = np.isin(types, [sym2id[s] for a, b, _ in cutoffs for s in (a, b)])
+    _, lab = np.unique(labels[sel], return_inverse=True)
+    masses = cluster_geometry.type_masses(sym2id)[types[sel]]
+    table = cluster_geometry.cluster_descriptors(lab, coords[sel], masses, pbc)
+    cluster_geometry.write_cluster_table(fname, table)
+
+def frame_sizes(data, cutoffs, sym2id, pbc, vl=None, members=False, export=None):
+    """
+    (sizes of clusters ≥2, members) of one frame read with
+    frame_columns(skin, members); members is (ids, labels) of the atoms in
+    those clusters when asked for (--lineage), else None.  With export,
+    the frame's cluster list is also written to that file.
+    """
+    if vl is not None:
+        order, labels = vl.cluster_labels(*data, pbc)
+        ids, types, coords = (a[order] for a in data)
+    else:
+        ids, types, coords = data if members else (None, *data)
+        labels = cluster_labels(types, coords, cutoffs, sym2id, pbc)
+    if export is not None:
+        export_clusters(export, types, coords, labels, cutoffs, sym2id, pbc)
+    counts = np.bincount(labels)
+    if not members:
+        return counts[counts>=2], None
+    m = counts[labels] >= 2
+    return counts[counts>=2], (ids[m], labels[m])
+
+def frame_columns(skin, members=False):
+    return ["id", "type", "xyz"] if skin > 0 or members else ["type", "xyz"]
+
+def iter_cluster_sizes(fname, frames, cutoffs, sym2id, pbc=True, skin=0.0,
+                       members=False, export=None):
+    """Yield (frame_idx, step, sizes of clusters ≥2, members) for the given
+    frames of a dump file or StagedTrajectory (writing export.<frame_idx>
+    cluster lists when export is a prefix)."""
+    table = lammps_dump.frame_table(fname)
+    vl = VerletPairs(cutoffs, sym2id, skin) if skin > 0 else None
+    for idx,step,data in lammps_dump.iter_frames(fname, frame_columns(skin, members),
+                                                 frames=frames):
+        box = lammps_dump.periodic_box(table, idx) if pbc else None
+        yield (idx, step) + frame_sizes(data, cutoffs, sym2id, box, vl, members,
+                                        f"{export}.{idx}" if export else None)
+
+def follow_cluster_sizes(args, cutoffs, sym2id, select_ranges):
+    """
+    --follow: yield (frame_idx, step, sizes, members) for each newly
+    completed frame, and None each time the reader has caught up with LAMMPS.
+    """
+    vl = VerletPairs(cutoffs, sym2id, args.skin) if args.skin > 0 else None
+    members = args.lineage is not None
+    for got in lammps_dump.follow_frames(args.dump, frame_columns(args.skin, members), args.skip,
+                                         select_ranges, args.xaxis, poll=args.poll,
+                                         with_box=True):
+        if got is None:
+            yield None
+            continue
+        idx,step,data,box = got
+        pbc = lammps_dump.periodic_box(box, 0) if args.pbc else None
+        yield (idx, step) + frame_sizes(data, cutoffs, sym2id, pbc, vl, members,
+                                        f"{args.export}.{idx}" if args.export else None)
+
+def _cluster_chunk(job):
+    # worker 進程：自己開檔讀一段連續幀，只回傳小結果
+    fname, frames, cutoffs, sym2id, pbc, skin, members, export = job
+    return list(iter_cluster_sizes(fname, frames, cutoffs, sym2id, pbc, skin,
+                                   members, export))
+
+def _cluster_decoded(job):
+    # worker 進程：幀已由主進程解壓讀好，這裡只做分群
+    chunk, cutoffs, sym2id, skin, members, export = job
+    vl = VerletPairs(cutoffs, sym2id, skin) if skin > 0 else None
+    return [(idx, step) + frame_sizes(data, cutoffs, sym2id, box, vl, members,
+                                      f"{export}.{idx}" if export else None)
+            for idx, step, data, box in chunk]
+
+def decoded_chunks(fname, frames, columns, pbc, size):
+    """Read the frames in one forward pass and yield them in lists of `size`."""
+    table = lammps_dump.frame_table(fname)
+    chunk = []
+    for idx,step,data in lammps_dump.iter_frames(fname, columns, frames=frames):
+        chunk.append((idx, step, data, lammps_dump.periodic_box(table, idx) if pbc else None))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def ordered_results(pool, fn, jobs, depth):
+    """Like pool.map, but jobs are taken lazily with at most `depth` in flight."""
+    pending = collections.deque()
+    for job in jobs:
+        pending.append(pool.submit(fn, job))
+        if len(pending) >= depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
 def main():
     args    = parse_args()
-    sym2id  = parse_types(args.types)
-    cutoffs = parse_cutoffs(args.cutoffs)
+    sym2id  = cluster_geometry.parse_types(args.types)
+    cutoffs = cluster_geometry.parse_cutoffs(args.cutoffs)
     select_ranges = parse_select(args.select) if args.select else None
 
-    frames      = parse_lammps_dump(args.dump)
-    x_times     = []
-    x_frames    = []
-    cluster_cnt = []
-    size_hist   = defaultdict(lambda: defaultdict(int))
+    # 多階段：equil/init/peak/final 串成一條時間軸
+    source = (lammps_dump.StagedTrajectory(lammps_dump.parse_stages(args.stages))
+              if args.stages else args.dump)
+    bounds = source.boundaries(args.xaxis) if args.stages else None
 
-    for idx,(step,types,coords) in enumerate(frames):
-        if idx % args.skip != 0: continue
-        xval = idx if args.xaxis=="frame" else step
-        if select_ranges and not in_selection(xval, select_ranges):
-            continue
+    xlabel = {"frame": "Frame index", "time": "Time (ps)"}.get(args.xaxis, "Timestep")
+    members = args.lineage is not None
+    tracker = (cluster_lineage.ClusterTracker(f"{args.lineage}_events.csv")
+               if members else None)
+
+    def xval(idx, step):
+        if args.xaxis == "frame":
+            return idx
+        if args.xaxis == "time":
+            return float(source.table["time"][idx])
+        return step
+
+    def record(idx, step, sizes, atoms=None):
+        if tracker is not None:
+            tracker.update(idx, step, *atoms)
+        hist.add(xval(idx, step), sizes)
+
+    if args.follow:
+        # 跟隨模式：每追上一次 LAMMPS 就刷新輸出
+        hist = cluster_hist.SizeHistogram(out=args.hist_out)
+        plotted = 0
+        try:
+            for got in follow_cluster_sizes(args, cutoffs, sym2id, select_ranges):
+                if got is not None:
+                    record(*got)
+                elif hist.n > plotted:
+                    plot_outputs(hist, xlabel, max_cols=args.heatmap_cols)
+                    plotted = hist.n
+                    print(f"[follow] {plotted} frames analysed, last {xlabel.lower()} {hist.x[-1]}")
+        except KeyboardInterrupt:
+            if hist.n > plotted:
+                plot_outputs(hist, xlabel, max_cols=args.heatmap_cols)
+        hist.close()
+        close_lineage(tracker, args.lineage)
+        return
 
-        adj      = build_adjacency(types, coords, cutoffs, sym2id)
-        clusters = [c for c in find_clusters(adj) if len(c)>=2]
-        cluster_cnt.append(len(clusters))
-        x_times.append(step)
-        x_frames.append(idx)
-        for c in clusters:
-            size_hist[len(c)][xval] += 1
+    frames      = lammps_dump.select_frames(lammps_dump.frame_table(source),
+                                            args.skip, select_ranges, args.xaxis)
+    hist        = cluster_hist.SizeHistogram(len(frames), out=args.hist_out)
+    columns     = frame_columns(args.skin, members)
+    if args.workers > 1 and len(frames) > 1 and \
+            not lammps_dump.random_access(source, columns):
+        # 壓縮檔只能往前讀：主進程解壓一次，把讀好的幀分給 worker
+        size    = max(1, -(-len(frames) // (4*args.workers)))
+        jobs    = ((c, cutoffs, sym2id, args.skin, members, args.export)
+                   for c in decoded_chunks(source, frames, columns, args.pbc, size))
+        pool    = ProcessPoolExecutor(max_workers=args.workers)
+        results = itertools.chain.from_iterable(
+            ordered_results(pool, _cluster_decoded, jobs, 2*args.workers))
+    elif args.workers > 1 and len(frames) > 1:
+        nchunk = min(len(frames), 4*args.workers)
+        jobs   = [(source, c, cutoffs, sym2id, args.pbc, args.skin, members, args.export)
+                  for c in np.array_split(frames, nchunk)]
+        pool    = ProcessPoolExecutor(max_workers=args.workers)
+        # map() keeps chunk order, so results arrive in frame order
+        results = itertools.chain.from_iterable(pool.map(_cluster_chunk, jobs))
+    else:
+        pool    = None
+        results = iter_cluster_sizes(source, frames, cutoffs, sym2id, args.pbc,
+                                     args.skin, members, args.export)
 
-    # choose x-axis
-    xvals = x_frames if args.xaxis=="frame" else x_times
-    xlabel = "Frame index" if args.xaxis=="frame" else "Timestep"
+    for got in results:
+        record(*got)
+    if pool is not None:
+        pool.shutdown()
+    hist.close()
+    close_lineage(tracker, args.lineage)
 
+    plot_outputs(hist, xlabel, bounds, args.heatmap_cols)
+
+def close_lineage(tracker, prefix):
+    if tracker is None:
+        return
+    tracker.close(f"{prefix}_clusters.csv")
+    print(f"Lineage: {len(tracker.clusters)} clusters, {tracker.n_events} events "
+          f"-> {prefix}_events.csv, {prefix}_clusters.csv")
+
+def plot_outputs(hist, xlabel, boundaries=None, max_cols=200):
+    """Write cluster_count_vs_time.pdf and cluster_size_heatmap.pdf."""
     # --- plot cluster count ---
     plt.figure(figsize=(6,4))
-    plt.scatter(xvals, cluster_cnt, s=40, c="tab:blue")
+    plt.scatter(hist.x, hist.cluster_count(), s=40, c="tab:blue")
+    for x in boundaries or []:
+        plt.axvline(x=x, color='grey', linestyle='dashdot', linewidth=1)
     plt.xlabel(xlabel); plt.ylabel("Cluster Count (≥2)")
     plt.tight_layout()
     plt.savefig("cluster_count_vs_time.pdf", dpi=900)
     plt.close()
 
-    # --- prepare heatmap data ---
-    steps = xvals
-    sizes = sorted(size_hist)
-    Z = np.zeros((len(sizes), len(steps)), int)
-    for i,s in enumerate(sizes):
-        for j,st in enumerate(steps):
-            Z[i,j] = size_hist[s].get(st, 0)
-
-    # --- plot annotated heatmap ---
+    # --- plot heatmap (binned / annotated by cluster_hist) ---
+    sizes, Z = hist.matrix(size_min=2)
     fig, ax = plt.subplots(figsize=(8,6))
-    X, Y = np.arange(len(steps)+1), np.arange(len(sizes)+1)
-    Zm = np.ma.masked_where(Z==0, Z)
-    cmap = plt.cm.viridis; cmap.set_bad(color='white')
-    pcm = ax.pcolormesh(X, Y, Zm, cmap=cmap, shading="flat")
-
-    # annotate each non-zero cell
-    for i in range(len(sizes)):
-        for j in range(len(steps)):
-            val = Z[i,j]
-            if val:
-                ax.text(j+0.5, i+0.5, str(val),
-                        ha='center', va='center', fontsize=8, color='white')
-
-    ax.set_xticks(np.arange(len(steps))+0.5)
-    ax.set_xticklabels(steps, rotation=90)
-    ax.set_yticks(np.arange(len(sizes))+0.5)
-    ax.set_yticklabels(sizes)
-    ax.set_xlabel(xlabel); ax.set_ylabel("Cluster Size")
-
-    cbar = fig.colorbar(pcm, ax=ax, label="Count")
+    pcm, w = cluster_hist.draw_size_heatmap(ax, hist.x, sizes, Z, max_cols)
+    ax.set_xlabel(xlabel if w == 1 else f"{xlabel} (start of {w}-frame window)")
+    ax.set_ylabel("Cluster Size")
+
+    cbar = fig.colorbar(pcm, ax=ax, label="Count" if w == 1 else f"Count per {w} frames")
     cbar.locator = MaxNLocator(integer=True)
     cbar.update_ticks()
 
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+cluster_geometry.py: per-cluster COM, radius of gyration and gyration tensor
+
+Computes, from cluster labels and atom positions, the columns of OVITO's
+cluster-list export (Cluster Identifier, Cluster Size, Center of Mass.X/Y/Z,
+Radius of Gyration, Gyration Tensor.XX/YY/ZZ/XY/XZ/YZ) with one np.bincount
+per quantity over the labels, so no per-cluster Python loop is involved.
+
+Periodic images are unwrapped per cluster: every atom is placed at the
+minimum image of its position relative to the first atom of its cluster,
+which is exact for clusters smaller than half the box.  Centers of mass are
+mass weighted (ATOMIC_MASS by element symbol) and wrapped back into the box;
+the gyration tensor is Σ m (r-com)_a (r-com)_b / Σ m, as in OVITO.
+
+The --types / --cutoffs parsers and the KD-tree pair search (find_pairs,
+find_dimers) shared by cluster_analysis_pair-without-ovito-only-traj.py
+and cluster_stable_pair_detector.py live here too.
+
+Usage from a script in this folder:
+  import cluster_geometry
+  table = cluster_geometry.cluster_descriptors(labels, xyz, masses, pbc=(lo, boxsize))
+  cluster_geometry.write_cluster_table("raw-native.100", table)
+
+The files written by write_cluster_table() have OVITO's quoted header, so
+ovito_clusters.py, cluster_analysis-need-ovito-data.py and
+cluster_stable_pair_detector.py -p read them like OVITO exports.
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# 原子質量 (amu)，與 in.FLiBe 的 mass 設定一致；未列出的元素以等質量處理
+ATOMIC_MASS = {"H": 1.008, "Li": 6.94, "Be": 9.0122, "F": 18.998, "Zr": 91.224}
+
+COLUMNS = [
+    "Cluster Identifier", "Cluster Size",
+    "Center of Mass.X", "Center of Mass.Y", "Center of Mass.Z",
+    "Radius of Gyration",
+    "Gyration Tensor.XX", "Gyration Tensor.YY", "Gyration Tensor.ZZ",
+    "Gyration Tensor.XY", "Gyration Tensor.XZ", "Gyration Tensor.YZ",
+]
+
+
+def parse_types(txt):
+    """--types "1:F,2:Be,3:Li" → {symbol: LAMMPS type}."""
+    sym2id = {}
+    for item in txt.split(","):
+        tid, sym = item.split(":")
+        sym2id[sym] = int(tid)
+    return sym2id
+
+
+def parse_cutoffs(txt):
+    """--cutoffs "F-F:1.7,Li-F:2.3" → [(symA, symB, cutoff), …]."""
+    out = []
+    for item in txt.split(","):
+        pair, d = item.split(":")
+        a, b = pair.split("-")
+        out.append((a, b, float(d)))
+    return out
+
+
+def type_masses(sym2id):
+    """Mass lookup array indexed by LAMMPS type (1.0 for unknown elements)."""
+    mass = np.ones(max(sym2id.values()) + 1)
+    for sym, tid in sym2id.items():
+        mass[tid] = ATOMIC_MASS.get(sym, 1.0)
+    return mass
+
+
+def minimum_image(d, boxsize):
+    """Apply the minimum-image convention to displacement vectors d."""
+    if boxsize is None:
+        return d
+    per = boxsize > 0
+    d[:, per] -= boxsize[per] * np.round(d[:, per] / boxsize[per])
+    return d
+
+
+def find_pairs(types, coords, cutoffs, sym2id, boxsize=None, skin=0.0):
+    """
+    Index arrays (i, j, cut) of every pair within its cutoff (+ skin); the
+    pairs of all requested cutoffs are merged into one edge list.
+    With boxsize the coords must already be wrapped into [0, L) and pairs
+    across periodic boundaries are found by the KD-trees themselves.
+    """
+    rows, cols, cuts = [], [], []
+    for symA, symB, cutoff in cutoffs:
+        idA, idB = sym2id[symA], sym2id[symB]
+        idxA = np.nonzero(types == idA)[0]
+        idxB = np.nonzero(types == idB)[0]
+        if len(idxA) == 0 or len(idxB) == 0:
+            continue
+        ptsA, ptsB = coords[idxA], coords[idxB]
+        r = cutoff + skin
+        if idA == idB:
+            pairs = cKDTree(ptsA, boxsize=boxsize).query_pairs(r=r, output_type='ndarray')
+            rows.append(idxA[pairs[:, 0]]); cols.append(idxA[pairs[:, 1]])
+        else:
+            # 一次過找出全部 A–B 對，直接回傳索引陣列
+            treeA = cKDTree(ptsA, boxsize=boxsize)
+            treeB = cKDTree(ptsB, boxsize=boxsize)
+            pairs = treeA.sparse_distance_matrix(treeB, r, output_type='ndarray')
+            rows.append(idxA[pairs['i']]); cols.append(idxB[pairs['j']])
+        cuts.append(np.full(len(rows[-1]), cutoff))
+    if not rows:
+        return np.empty(0, int), np.empty(0, int), np.empty(0)
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(cuts)
+
+
+def find_dimers(types, coords, cutoffs, sym2id, boxsize=None):
+    """
+    Index arrays (i, j) of the size-2 clusters of one frame: pairs within
+    their cutoff whose two atoms have no other neighbour.  With boxsize the
+    coords must already be wrapped into [0, L).
+    """
+    i, j, _ = find_pairs(types, coords, cutoffs, sym2id, boxsize)
+    deg = np.bincount(i, minlength=len(types)) + np.bincount(j, minlength=len(types))
+    keep = (deg[i] == 1) & (deg[j] == 1)
+    return i[keep], j[keep]
+
+
+def cluster_descriptors(labels, coords, masses=None, pbc=None):
+    """
+    One row per cluster (labels 0..K-1), columns as COLUMNS; the cluster
+    identifier is label+1.  pbc is the (lo, boxsize) of
+    lammps_dump.periodic_box, or None for an open box.
+    """
+    labels = np.asarray(labels)
+    coords = np.asarray(coords, dtype=float)
+    m = np.ones(len(labels)) if masses is None else np.asarray(masses, dtype=float)
+    K = int(labels.max()) + 1 if len(labels) else 0
+    lo, boxsize = pbc if pbc is not None else (None, None)
+
+    # 以每個 cluster 的第一個原子為基準展開週期影像
+    first = np.full(K, len(labels))
+    np.minimum.at(first, labels, np.arange(len(labels)))
+    ref = coords[first]
+    d = minimum_image(coords - ref[labels], boxsize)
+
+    size = np.bincount(labels, minlength=K)
+    M = np.bincount(labels, weights=m, minlength=K)
+    dcom = np.column_stack([np.bincount(labels, weights=m*d[:, a], minlength=K)
+                            for a in range(3)]) / M[:, None]
+    com = ref + dcom
+    if boxsize is not None:
+        per = boxsize > 0
+        com[:, per] = lo[per] + np.mod(com[:, per] - lo[per], boxsize[per])
+
+    r = d - dcom[labels]
+    g = np.column_stack([np.bincount(labels, weights=m*r[:, a]*r[:, b], minlength=K)
+                         for a, b in ((0, 0), (1, 1), (2, 2), (0, 1), (0, 2), (1, 2))]) / M[:, None]
+    rg = np.sqrt(g[:, :3].sum(axis=1))
+    return np.column_stack([np.arange(1, K + 1), size, com, rg, g])
+
+
+def write_cluster_table(fname, table):
+    """Write cluster_descriptors() rows in OVITO's cluster-list text format."""
+    with open(fname, "w") as f:
+        f.write(f"# Cluster list ({len(table)} rows):\n")
+        f.write("# " + " ".join(f'"{c}"' for c in COLUMNS) + "\n")
+        np.savetxt(f, table, fmt=["%d", "%d"] + ["%.6g"] * (len(COLUMNS) - 2))
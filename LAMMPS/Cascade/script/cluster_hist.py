@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+cluster_hist.py: cluster-size vs time histogram kept as one dense array
+
+SizeHistogram.counts[k, s] is the number of clusters of size s in the
+k-th recorded frame (x[k] is its timestep / frame / time).  Each frame is
+added with one np.bincount; rows and columns grow by doubling, so a run of
+unknown length costs no more than a few reallocations.  With out=PATH every
+frame is also appended to PATH as “x,size,count” lines (non-zero cells
+only), which keeps the whole history on disk for very long runs.
+
+Usage from a script in this folder:
+  import cluster_hist
+  hist = cluster_hist.SizeHistogram(nframes=len(frames), out="cluster_size_hist.csv")
+  for step, sizes in …:
+      hist.add(step, sizes)
+  sizes, Z = hist.matrix(size_min=2)      # Z[i, k]: clusters of size sizes[i] in frame k
+
+or, from a table with one row per cluster:
+  hist = cluster_hist.SizeHistogram.from_table(df["frame"], df["cluster_size"])
+
+draw_size_heatmap() renders (sizes, Z) so that plotting time does not grow
+with the number of frames: beyond max_cols columns, consecutive frames are
+summed into equal windows; cell values are written only on small grids; the
+mesh is rasterized inside the PDF on large grids; tick labels are thinned
+to at most max_labels per axis.
+"""
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+class SizeHistogram:
+    """Dense per-frame cluster-size counts; see module docstring."""
+
+    def __init__(self, nframes=0, max_size=32, out=None):
+        self.counts = np.zeros((max(nframes, 16), max_size + 1), dtype=np.int64)
+        self._x = []
+        self.n = 0
+        self._fh = open(out, "w") if out else None
+        if self._fh:
+            self._fh.write("x,size,count\n")
+
+    def _reserve(self, rows, cols):
+        R, C = self.counts.shape
+        if rows > R or cols > C:
+            grown = np.zeros((max(rows, 2*R) if rows > R else R,
+                              max(cols, 2*C) if cols > C else C), dtype=np.int64)
+            grown[:R, :C] = self.counts
+            self.counts = grown
+
+    def add(self, x, sizes):
+        """Record the cluster sizes of one frame at x-axis value x."""
+        c = np.bincount(np.asarray(sizes, dtype=np.int64))
+        self._reserve(self.n + 1, len(c))
+        self.counts[self.n, :len(c)] = c
+        self._x.append(x)
+        self.n += 1
+        if self._fh:
+            nz = np.nonzero(c)[0]
+            np.savetxt(self._fh, np.column_stack([np.full(len(nz), x), nz, c[nz]]),
+                       fmt="%.10g,%d,%d")
+            self._fh.flush()
+
+    @classmethod
+    def from_table(cls, frames, sizes):
+        """One row per distinct frame (sorted) from per-cluster (frame, size) columns."""
+        frames = np.asarray(frames)
+        sizes  = np.asarray(sizes, dtype=np.int64)
+        ux, row = np.unique(frames, return_inverse=True)
+        width = int(sizes.max()) + 1 if len(sizes) else 1
+        hist = cls(len(ux), width - 1)
+        hist.counts[:len(ux), :width] = np.bincount(
+            row * width + sizes, minlength=len(ux) * width).reshape(len(ux), width)
+        hist._x = list(ux)
+        hist.n = len(ux)
+        return hist
+
+    @property
+    def x(self):
+        return np.asarray(self._x)
+
+    def cluster_count(self, size_min=2):
+        """Number of clusters with ≥size_min atoms in each frame."""
+        return self.counts[:self.n, size_min:].sum(axis=1)
+
+    def matrix(self, size_min=1, size_max=None):
+        """
+        (sizes, Z) with Z[i, k] the count of clusters of size sizes[i] in
+        frame k; only sizes in [size_min, size_max] that occur at all.
+        """
+        sub = self.counts[:self.n, size_min:(size_max + 1 if size_max is not None else None)]
+        keep = np.nonzero(sub.any(axis=0))[0]
+        return keep + size_min, sub[:, keep].T
+
+    def close(self):
+        if self._fh:
+            self._fh.close()
+            self._fh = None
+
+
+def bin_columns(x, Z, max_cols):
+    """
+    Sum Z over windows of consecutive columns so that at most max_cols
+    remain (max_cols 0/None: no binning).  Returns (x at each window
+    start, binned Z, window width in frames).
+    """
+    n = Z.shape[1]
+    if not max_cols or n <= max_cols:
+        return x, Z, 1
+    w = -(-n // max_cols)
+    starts = np.arange(0, n, w)
+    return x[starts], np.add.reduceat(Z, starts, axis=1), w
+
+
+def thin_ticks(n, max_labels):
+    """Positions of at most max_labels evenly spaced ticks out of n."""
+    return np.arange(0, n, max(1, -(-n // max_labels)))
+
+
+def draw_size_heatmap(ax, x, sizes, Z, max_cols=200, annotate_max=60, max_labels=30):
+    """
+    Draw the size × x heatmap (zeros blank) on ax.  Returns (pcm, w),
+    w being the number of frames summed into each column.
+    """
+    x, Z, w = bin_columns(np.asarray(x), np.asarray(Z), max_cols)
+    ny, nx = Z.shape
+    small = nx <= annotate_max and ny <= annotate_max
+
+    Zm = np.ma.masked_where(Z == 0, Z)
+    cmap = plt.cm.viridis.copy(); cmap.set_bad(color='white')
+    pcm = ax.pcolormesh(np.arange(nx+1), np.arange(ny+1), Zm, cmap=cmap,
+                        shading="flat", rasterized=not small)
+
+    # 格子夠少才標數字，否則文字物件本身就拖慢繪圖
+    if small:
+        for i, j in zip(*np.nonzero(Z)):
+            ax.text(j+0.5, i+0.5, str(Z[i,j]),
+                    ha='center', va='center', fontsize=8, color='white')
+
+    xt = thin_ticks(nx, max_labels)
+    ax.set_xticks(xt+0.5)
+    # 浮點時間 (--xaxis time) 會帶出 0.00030000000000000003 之類的尾數
+    ax.set_xticklabels([f"{v:.10g}" for v in x[xt]], rotation=90)
+    yt = thin_ticks(ny, max_labels)
+    ax.set_yticks(yt+0.5)
+    ax.set_yticklabels(np.asarray(sizes)[yt])
+    return pcm, w
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+cluster_lineage.py: follow clusters from frame to frame by shared atom ids
+
+For consecutive frames t and t+1, the clusters are matched through a
+sparse contingency matrix M[p, c] = number of atoms that cluster p at t
+and cluster c at t+1 have in common (atoms matched by LAMMPS id, so the
+atom order in the dump does not matter).  From the non-zeros of M:
+
+  birth   cluster c at t+1 with no atom from any cluster at t
+  death   cluster p at t whose atoms are in no cluster at t+1
+  merge   cluster c at t+1 fed by ≥2 clusters at t
+  split   cluster p at t spread over ≥2 clusters at t+1
+
+A cluster keeps its lineage id from t to t+1 when p and c are each
+other's largest overlap; otherwise the cluster at t+1 gets a new id.
+
+Usage from a script in this folder:
+  import cluster_lineage
+  tracker = cluster_lineage.ClusterTracker("lineage_events.csv")
+  for frame, step, ids, labels in …:      # atoms of clusters ≥2 only
+      tracker.update(frame, step, ids, labels)
+  tracker.close("lineage_clusters.csv")
+
+Outputs:
+  events csv    frame,step,event,cluster_id,size,related
+                (related = ';'-joined parent ids for merge / child ids for split)
+  clusters csv  cluster_id,birth_frame,birth_step,last_frame,last_step,
+                n_frames,max_size
+"""
+
+import csv
+import numpy as np
+from scipy.sparse import coo_matrix
+
+
+class ClusterTracker:
+    """Streaming cluster lineage tracker; see module docstring."""
+
+    EVENT_COLUMNS   = ["frame", "step", "event", "cluster_id", "size", "related"]
+    CLUSTER_COLUMNS = ["cluster_id", "birth_frame", "birth_step", "last_frame",
+                       "last_step", "n_frames", "max_size"]
+
+    def __init__(self, events_csv=None):
+        self.prev_ids = self.prev_lab = self.prev_uid = None
+        self.next_uid = 0
+        # per lineage id: birth_frame, birth_step, last_frame, last_step, n_frames, max_size
+        self.clusters = {}
+        self._fh = open(events_csv, "w", newline="") if events_csv else None
+        self._out = csv.writer(self._fh) if self._fh else None
+        if self._out:
+            self._out.writerow(self.EVENT_COLUMNS)
+        self.n_events = 0
+
+    def _emit(self, frame, step, event, uid, size, related=()):
+        self.n_events += 1
+        if self._out:
+            self._out.writerow([frame, step, event, uid, size,
+                                ";".join(str(r) for r in related)])
+
+    def update(self, frame, step, ids, labels):
+        """
+        Add one frame.  ids are the LAMMPS ids of the atoms that belong to
+        a tracked cluster (e.g. size ≥2) and labels their cluster labels
+        (any integers).  Returns the lineage id of every cluster, in the
+        order of np.unique(labels).
+        """
+        ids = np.asarray(ids)
+        _, lab = np.unique(labels, return_inverse=True)
+        ncur = int(lab.max()) + 1 if len(lab) else 0
+        size = np.bincount(lab, minlength=ncur)
+
+        if self.prev_ids is None:
+            uid = self._new_uids(ncur)
+            for c in range(ncur):
+                self._emit(frame, step, "birth", uid[c], size[c])
+        else:
+            uid = self._match(frame, step, ids, lab, ncur, size)
+
+        for c in range(ncur):
+            u = int(uid[c])
+            rec = self.clusters.get(u)
+            if rec is None:
+                self.clusters[u] = [frame, step, frame, step, 1, int(size[c])]
+            else:
+                rec[2], rec[3] = frame, step
+                rec[4] += 1
+                rec[5] = max(rec[5], int(size[c]))
+
+        self.prev_ids, self.prev_lab, self.prev_uid = ids, lab, uid
+        return uid
+
+    def _new_uids(self, n):
+        uid = np.arange(self.next_uid, self.next_uid + n)
+        self.next_uid += n
+        return uid
+
+    def _match(self, frame, step, ids, lab, ncur, size):
+        nprev = len(self.prev_uid)
+        _, ia, ib = np.intersect1d(self.prev_ids, ids, assume_unique=True,
+                                   return_indices=True)
+        M = coo_matrix((np.ones(len(ia), dtype=np.int64),
+                        (self.prev_lab[ia], lab[ib])), shape=(nprev, ncur)).tocsr()
+        B = (M > 0).astype(np.int64)
+        n_parents  = np.asarray(B.sum(axis=0)).ravel()
+        n_children = np.asarray(B.sum(axis=1)).ravel()
+
+        # 互為最大重疊的 (p, c) 才延續同一個 lineage id
+        uid = np.full(ncur, -1, dtype=np.int64)
+        if nprev and ncur:
+            best_c = np.asarray(M.argmax(axis=1)).ravel()
+            best_p = np.asarray(M.argmax(axis=0)).ravel()
+            cont = np.nonzero(n_parents > 0)[0]
+            keep = cont[best_c[best_p[cont]] == cont]
+            uid[keep] = self.prev_uid[best_p[keep]]
+        fresh = np.nonzero(uid < 0)[0]
+        uid[fresh] = self._new_uids(len(fresh))
+
+        Mc = M.tocsc()
+        for c in np.nonzero(n_parents == 0)[0]:
+            self._emit(frame, step, "birth", uid[c], size[c])
+        for c in np.nonzero(n_parents >= 2)[0]:
+            parents = Mc.indices[Mc.indptr[c]:Mc.indptr[c + 1]]
+            self._emit(frame, step, "merge", uid[c], size[c], self.prev_uid[parents])
+        prev_size = np.bincount(self.prev_lab, minlength=nprev)
+        for p in np.nonzero(n_children == 0)[0]:
+            self._emit(frame, step, "death", self.prev_uid[p], prev_size[p])
+        for p in np.nonzero(n_children >= 2)[0]:
+            children = M.indices[M.indptr[p]:M.indptr[p + 1]]
+            self._emit(frame, step, "split", self.prev_uid[p], prev_size[p], uid[children])
+        return uid
+
+    def close(self, clusters_csv=None):
+        """Close the events file and optionally write the per-lineage table."""
+        if self._fh:
+            self._fh.close()
+            self._fh = self._out = None
+        if clusters_csv:
+            with open(clusters_csv, "w", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(self.CLUSTER_COLUMNS)
+                for u in sorted(self.clusters):
+                    w.writerow([u] + self.clusters[u])
@@ -2,46 +2,88 @@
 """
 cluster_stable_F2_detector.py
 
-Detect “stable” F₂ molecules from OVITO cluster‐list exports.
+Detect “stable” F₂ molecules from OVITO cluster‐list exports, or directly
+from a LAMMPS dump in one streaming pass (no OVITO export step).
 
 Usage:
   python cluster_stable_F2_detector.py \
     -p raw-initerior-all \
     -t 1.7 \
     -n 50 \
-    [-s 0-100,200]
+    [-s 0-100,200] \
+    [-m greedy]
+
+  python cluster_stable_F2_detector.py \
+    -d dump.init_interior \
+    --types 1:F,2:Be,3:Li \
+    -c F-F:1.7 \
+    -n 50
 
 Arguments:
   -p, --prefix     Filename prefix (e.g. raw-initerior-all)
+  -d, --dump       LAMMPS dump (with id, type, xu/yu/zu) instead of --prefix:
+                   size-2 clusters are the atom pairs within --cutoff that have
+                   no other neighbour, their COMs are taken across periodic
+                   boundaries, and a molecule is followed by its two atom ids
+                   (-t / -m are not used).  Frames are dump frame indices.
+  --types          ID:SYMBOL mapping for --dump (default: 1:F,2:Be,3:Li)
+  -c, --cutoff     SYMBOL1-SYMBOL2:CUTOFF pair cutoff(s) for --dump (default: F-F:1.7)
+  --no-pbc         With --dump, ignore the periodic box
   -t, --track-dist COM tracking distance threshold (Å), only size=2 clusters
   -n, --persist    Minimum consecutive frames to consider “stable” (default:1)
   -s, --select     (optional) Frames to include, e.g. 0-100,200
+  -w, --workers    Reader threads for the export files (default: auto)
+  -m, --match      How COMs of a frame are assigned to the trajectories of the
+                   previous frame (candidates within track_dist come from a KD-tree):
+                     first     each COM in file order takes the nearest free
+                               trajectory (default, the original behaviour)
+                     greedy    closest pairs first over the whole frame
+                     hungarian one-to-one assignment with the smallest total
+                               distance among the maximum number of matches
+
+The exports are parsed once into <prefix>.clusters.npz (ovito_clusters.py)
+and reused until a file is added, removed or modified.
 
 Outputs:
-  cluster_stable_F2_<track_dist>.csv  with columns:
+  cluster_stable_F2_<track_dist>.csv  (--dump: cluster_stable_F2_<cutoff>.csv) with columns:
     start_frame,end_frame,duration,com_x,com_y,com_z
     fig_delta_r_COM_hist.pdf              histogram of all matched displacements
     fig_delta_r_COM_stable_hist.pdf       histogram of Δr_COM from persist-qualified stable F₂
     collect_fig_delta_r_COM_stats.log      statistics summary for both categories
 """
-import os
-import re
 import argparse
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
+from scipy.optimize import linear_sum_assignment
+import ovito_clusters
+import lammps_dump
+import cluster_geometry
 
 def parse_args():
     p = argparse.ArgumentParser(
         description="Detect stable F₂ from OVITO cluster‐list exports"
     )
-    p.add_argument("-p", "--prefix", required=True, help="Filename prefix (e.g. raw-initerior-all)")
+    src = p.add_mutually_exclusive_group(required=True)
+    src.add_argument("-p", "--prefix", help="Filename prefix (e.g. raw-initerior-all)")
+    src.add_argument("-d", "--dump", help="LAMMPS dump to analyse directly, without OVITO exports")
     p.add_argument("-t", "--track-dist", dest="track_dist", type=float, default=0.5,
                    help="COM tracking distance threshold in Å (default: 0.5)")
     p.add_argument("-n", "--persist", type=int, default=1,
                    help="Minimum consecutive frames to be stable (default: 1)")
     p.add_argument("-s", "--select", default=None,
                    help="Frames to include, e.g. 0-100,200 (optional)")
+    p.add_argument("-m", "--match", choices=["first", "greedy", "hungarian"], default="first",
+                   help="COM-to-trajectory assignment (default: first)")
+    p.add_argument("-w", "--workers", type=int, default=None,
+                   help="Reader threads for the export files (default: auto)")
+    p.add_argument("--types", default="1:F,2:Be,3:Li",
+                   help="ID:SYMBOL mapping for --dump (default: 1:F,2:Be,3:Li)")
+    p.add_argument("-c", "--cutoff", default="F-F:1.7",
+                   help="Pair cutoff(s) for --dump, e.g. F-F:1.7 (default: F-F:1.7)")
+    p.add_argument("--no-pbc", dest="pbc", action="store_false",
+                   help="With --dump, ignore the periodic box")
     return p.parse_args()
 
 def parse_select(txt):
@@ -58,130 +100,211 @@ def parse_select(txt):
 def in_select(frame, ranges):
     return any(a <= frame <= b for a, b in ranges)
 
-def load_cluster_COMs(prefix, select_ranges=None):
-    entries = []
-    for fn in sorted(os.listdir(".")):
-        if not fn.startswith(prefix + "."):
-            continue
-        m = re.match(rf"{re.escape(prefix)}\.(\d+)", fn)
-        if not m:
-            continue
-        frame = int(m.group(1))
-        if select_ranges and not in_select(frame, select_ranges):
-            continue
-
-        cols = None
-        with open(fn) as f:
-            for L in f:
-                if '"' in L:
-                    cols = re.findall(r'"([^"]+)"', L)
-                    break
-        if not cols:
-            print(f"⚠️ skip {fn}: no quoted header")
-            continue
-
-        df = pd.read_csv(fn, comment="#", delim_whitespace=True, header=None, names=cols)
-        sub = df[df["Cluster Size"] == 2]
-        com = sub[["Center of Mass.X", "Center of Mass.Y", "Center of Mass.Z"]].values
-        entries.append((frame, com))
-
-    return sorted(entries, key=lambda x: x[0])
-
-def detect_stable_F2(frames_com, track_dist, persist):
-    trajs = []
-    stable = []
-    cut2 = track_dist * track_dist
-    delta_r_all = []
-    delta_r_stable = []
+def load_cluster_COMs(prefix, select_ranges=None, workers=None):
+    """[(frame, COMs of its size-2 clusters)] for every selected frame."""
+    frames, df = ovito_clusters.load_cluster_table(prefix, workers=workers)
+    if select_ranges:
+        frames = frames[[in_select(f, select_ranges) for f in frames]]
+    if len(df) and "Cluster Size" not in df.columns:
+        print(f"⚠️ skip {prefix}.*: no quoted header")
+        return []
+
+    # 表已按 frame 排序：用 searchsorted 切出每一幀的 COM
+    sub = df[df["Cluster Size"] == 2] if len(df) else df
+    fr  = sub["frame"].to_numpy()
+    com = sub[["Center of Mass.X", "Center of Mass.Y", "Center of Mass.Z"]].to_numpy(float) \
+        if len(sub) else np.empty((0, 3))
+    lo = np.searchsorted(fr, frames, side="left")
+    hi = np.searchsorted(fr, frames, side="right")
+    return [(int(f), com[a:b]) for f, a, b in zip(frames, lo, hi)]
+
+def match_heads(heads, coms, track_dist, match="first"):
+    """
+    One-to-one matches between trajectory heads (previous-frame COMs) and
+    the COMs of the current frame closer than track_dist.
+    Returns (head_idx, com_idx, distance) arrays.
+    """
+    none = (np.empty(0, int), np.empty(0, int), np.empty(0))
+    if not len(heads) or not len(coms):
+        return none
+    tree = cKDTree(heads)
+    if match == "first":
+        # 大多數幀沒有衝突：每個 COM 的最近 head 都不同，直接收下
+        d, h = tree.query(coms, distance_upper_bound=track_dist)
+        ok = d < track_dist
+        if len(np.unique(h[ok])) == ok.sum():
+            return h[ok], np.nonzero(ok)[0], d[ok]
+
+    sdm = tree.sparse_distance_matrix(cKDTree(coms), track_dist, output_type="ndarray")
+    sdm = sdm[sdm["v"] < track_dist]
+    hi, ci, d = sdm["i"].astype(int), sdm["j"].astype(int), sdm["v"]
+    if not len(d):
+        return none
+
+    if match == "hungarian":
+        # 只對有候選的 head/COM 建稠密成本矩陣；不可配對的給大成本
+        uh, rh = np.unique(hi, return_inverse=True)
+        uc, rc = np.unique(ci, return_inverse=True)
+        big  = track_dist * (min(len(uh), len(uc)) + 1)
+        cost = np.full((len(uh), len(uc)), big)
+        cost[rh, rc] = d
+        r, c = linear_sum_assignment(cost)
+        keep = cost[r, c] < big
+        return uh[r[keep]], uc[c[keep]], cost[r[keep], c[keep]]
+
+    # first: COMs in file order, each taking its nearest free head;
+    # greedy: globally closest pairs first
+    order = np.lexsort((d, ci)) if match == "first" else np.argsort(d, kind="stable")
+    used_h = np.zeros(len(heads), bool)
+    used_c = np.zeros(len(coms), bool)
+    take = []
+    for k in order:
+        if not used_h[hi[k]] and not used_c[ci[k]]:
+            used_h[hi[k]] = used_c[ci[k]] = True
+            take.append(k)
+    take = np.array(take, int)
+    return hi[take], ci[take], d[take]
+
+def detect_stable_F2(frames_com, track_dist, persist, match="first"):
+    """
+    Link size-2 cluster COMs of consecutive frames into trajectories.
+
+    Returns (stable, delta_r_all, delta_r_stable): stable is a DataFrame
+    with start_frame,end_frame,duration,com_x,com_y,com_z for trajectories
+    lasting ≥persist frames (in the order they end), and the delta_r arrays
+    hold the COM displacement of every match / of matches on stable ones.
+    """
+    # 軌跡狀態全部存成陣列：每條軌跡一個 id，heads 是上一幀仍存活的軌跡
+    head_tid = np.empty(0, int)
+    head_com = np.empty((0, 3))
+    prev     = None
+    starts, com0s, m_tid, m_d = [], [], [], []
+    ntraj = 0
 
     for frame, coms in frames_com:
-        for t in trajs:
-            t['matched'] = False
-        used = set()
-
-        for i, pt in enumerate(coms):
-            best = None
-            bestd = cut2
-            for t in trajs:
-                if t['last'] == frame - 1:
-                    d2 = np.sum((t['com'] - pt)**2)
-                    if d2 < bestd:
-                        bestd = d2
-                        best = t
-            if best:
-                d = np.sqrt(bestd)
-                delta_r_all.append(d)
-                best['history'].append((frame, pt.copy()))
-                best['last'] = frame
-                best['com'] = pt.copy()
-                best['matched'] = True
-                used.add(i)
-
-        new_trajs = []
-        for t in trajs:
-            if t.get('matched'):
-                new_trajs.append(t)
-            else:
-                dur = len(t['history'])
-                if dur >= persist:
-                    st = t['history'][0][0]
-                    en = t['history'][-1][0]
-                    c0 = t['history'][0][1]
-                    stable.append({
-                        'start_frame': st,
-                        'end_frame': en,
-                        'duration': dur,
-                        'com_x': c0[0],
-                        'com_y': c0[1],
-                        'com_z': c0[2],
-                        'history': t['history']
-                    })
-        trajs = new_trajs
-
-        for i, pt in enumerate(coms):
-            if i not in used:
-                trajs.append({
-                    'last': frame,
-                    'com': pt.copy(),
-                    'history': [(frame, pt.copy())]
-                })
-
-    for t in trajs:
-        dur = len(t['history'])
-        if dur >= persist:
-            st = t['history'][0][0]
-            en = t['history'][-1][0]
-            c0 = t['history'][0][1]
-            stable.append({
-                'start_frame': st,
-                'end_frame': en,
-                'duration': dur,
-                'com_x': c0[0],
-                'com_y': c0[1],
-                'com_z': c0[2],
-                'history': t['history']
-            })
-
-    for s in stable:
-        h = s['history']
-        for i in range(1, len(h)):
-            delta = np.linalg.norm(h[i][1] - h[i - 1][1])
-            delta_r_stable.append(delta)
+        coms = np.asarray(coms, float).reshape(-1, 3)
+        heads = head_com if prev == frame - 1 else head_com[:0]
+        hi, ci, d = match_heads(heads, coms, track_dist, match)
+
+        tid = np.full(len(coms), -1)
+        tid[ci] = head_tid[hi]
+        fresh = np.nonzero(tid < 0)[0]
+        tid[fresh] = np.arange(ntraj, ntraj + len(fresh))
+        ntraj += len(fresh)
+
+        starts.append(np.full(len(fresh), frame))
+        com0s.append(coms[fresh])
+        m_tid.append(head_tid[hi])
+        m_d.append(d)
+        head_tid, head_com, prev = tid, coms, frame
+
+    return stable_table(starts, com0s, m_tid, m_d, persist)
 
+def stable_table(starts, com0s, m_tid, m_d, persist):
+    """
+    (stable, delta_r_all, delta_r_stable) from per-frame lists of the new
+    trajectories' start frame / first COM and of the matches' trajectory
+    id / COM displacement.
+    """
+    start = np.concatenate(starts) if starts else np.empty(0, int)
+    com0  = np.concatenate(com0s) if com0s else np.empty((0, 3))
+    m_tid = np.concatenate(m_tid) if m_tid else np.empty(0, int)
+    delta_r_all = np.concatenate(m_d) if m_d else np.empty(0)
+    ntraj = len(start)
+
+    # frames of a trajectory are consecutive, so end = start + duration - 1
+    duration = 1 + np.bincount(m_tid, minlength=ntraj)
+    end      = start + duration - 1
+    is_stable = duration >= persist
+    sel = np.nonzero(is_stable)[0]
+    sel = sel[np.lexsort((sel, end[sel]))]
+    stable = pd.DataFrame({
+        'start_frame': start[sel],
+        'end_frame':   end[sel],
+        'duration':    duration[sel],
+        'com_x':       com0[sel, 0],
+        'com_y':       com0[sel, 1],
+        'com_z':       com0[sel, 2],
+    })
+    delta_r_stable = delta_r_all[is_stable[m_tid]]
     return stable, delta_r_all, delta_r_stable
 
+def detect_stable_F2_dump(fname, cutoffs, sym2id, persist, select_ranges=None, pbc=True):
+    """
+    detect_stable_F2 straight from a dump: one pass over the selected
+    frames, size-2 clusters from cluster_geometry.find_dimers(), molecules identified by
+    their (smaller id, larger id) pair.  Same return values.
+    """
+    idx    = lammps_dump.frame_table(fname)
+    frames = lammps_dump.select_frames(idx, 1, select_ranges, "frame")
+    mass   = cluster_geometry.type_masses(sym2id)
+
+    act_key = np.empty(0, np.int64)      # sorted keys of the molecules alive in the last frame
+    act_tid = np.empty(0, int)
+    act_com = np.empty((0, 3))
+    prev    = None
+    starts, com0s, m_tid, m_d = [], [], [], []
+    ntraj = 0
+
+    for n, step, (ids, types, xyz) in lammps_dump.iter_frames(fname, ["id", "type", "xyz"],
+                                                             frames=frames):
+        box = lammps_dump.periodic_box(idx, n) if pbc else None
+        if box is not None:
+            lo, boxsize = box
+            x = lammps_dump.wrap_positions(xyz, lo, boxsize)
+        else:
+            lo, boxsize, x = np.zeros(3), None, np.asarray(xyz, float)
+        i, j = cluster_geometry.find_dimers(types, x, cutoffs, sym2id, boxsize)
+
+        # 質心：以 i 為基準加上 minimum-image 位移，再包回盒子
+        wj  = (mass[types[j]] / (mass[types[i]] + mass[types[j]]))[:, None]
+        com = x[i] + wj * cluster_geometry.minimum_image(x[j] - x[i], boxsize)
+        if boxsize is not None:
+            com = lammps_dump.wrap_positions(com, np.zeros(3), boxsize)
+        com += lo
+
+        a, b  = ids[i].astype(np.int64), ids[j].astype(np.int64)
+        key   = (np.minimum(a, b) << 32) | np.maximum(a, b)
+        order = np.argsort(key)
+        key, com = key[order], com[order]
+
+        if prev == n - 1:
+            _, ia, ib = np.intersect1d(act_key, key, assume_unique=True, return_indices=True)
+        else:
+            ia = ib = np.empty(0, int)
+        tid = np.full(len(key), -1)
+        tid[ib] = act_tid[ia]
+        fresh = np.nonzero(tid < 0)[0]
+        tid[fresh] = np.arange(ntraj, ntraj + len(fresh))
+        ntraj += len(fresh)
+
+        starts.append(np.full(len(fresh), n))
+        com0s.append(com[fresh])
+        m_tid.append(act_tid[ia])
+        m_d.append(np.linalg.norm(cluster_geometry.minimum_image(com[ib] - act_com[ia], boxsize), axis=1))
+        act_key, act_tid, act_com, prev = key, tid, com, n
+
+    return stable_table(starts, com0s, m_tid, m_d, persist)
+
 def main():
     args = parse_args()
     select_ranges = parse_select(args.select) if args.select else None
-    frames_com = load_cluster_COMs(args.prefix, select_ranges)
-    print(f">>> matched {len(frames_com)} files with prefix \"{args.prefix}\"")
-    for f, coms in frames_com[:5]:
-        print(f" frame {f}: got {len(coms)} size-2 clusters")
-
-    stable, delta_r_all, delta_r_stable = detect_stable_F2(frames_com, args.track_dist, args.persist)
-    df = pd.DataFrame([{k: s[k] for k in s if k != 'history'} for s in stable],
-                      columns=['start_frame','end_frame','duration','com_x','com_y','com_z'])
-    out = f"cluster_stable_F2_{args.track_dist:.2f}.csv"
+    if args.dump:
+        cutoffs = cluster_geometry.parse_cutoffs(args.cutoff)
+        dist = max(c for _, _, c in cutoffs)
+        df, delta_r_all, delta_r_stable = detect_stable_F2_dump(
+            args.dump, cutoffs, cluster_geometry.parse_types(args.types), args.persist, select_ranges, args.pbc)
+        dist_label = "pair cutoff"
+    else:
+        frames_com = load_cluster_COMs(args.prefix, select_ranges, args.workers)
+        print(f">>> matched {len(frames_com)} files with prefix \"{args.prefix}\"")
+        for f, coms in frames_com[:5]:
+            print(f" frame {f}: got {len(coms)} size-2 clusters")
+
+        df, delta_r_all, delta_r_stable = detect_stable_F2(frames_com, args.track_dist,
+                                                           args.persist, args.match)
+        dist, dist_label = args.track_dist, "track_dist"
+    out = f"cluster_stable_F2_{dist:.2f}.csv"
     df.to_csv(out, index=False)
     print(f"Detected {len(df)} stable F₂ → {out}")
 
@@ -211,7 +334,7 @@ def main():
     with open("collect_fig_delta_r_COM_stats.log", "w") as f:
         f.write("Δr_COM statistics\n=================\n")
         f.write("[All matched F₂ pairs]\n")
-        f.write(f"track_dist       = {args.track_dist:.3f} Å\n")
+        f.write(f"{dist_label:<16} = {dist:.3f} Å\n")
         f.write(f"mean Δr_COM      = {stats_all[0]:.3f} Å\n")
         f.write(f"max Δr_COM       = {stats_all[1]:.3f} Å\n")
         f.write(f"95th percentile  = {stats_all[2]:.3f} Å\n")
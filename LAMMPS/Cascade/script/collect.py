@@ -14,7 +14,7 @@ FLiBe 熔鹽系統平衡過程數據可視化腳本
 - **高解析度輸出**：圖表將以 `1200 dpi` 高解析度保存，適用於學術論文或報告。
 
 📌 依賴：
-- 需要 Python 環境，並安裝 `numpy` 和 `matplotlib` 庫。
+- 需要 Python 環境，並安裝 `numpy`、`pandas` 和 `matplotlib` 庫；同資料夾的 lammps_log.py。
 - 數據文件應為 `flibe_equil_*.txt` 格式，並包含時間和物理量數據。
 
 📌 適用場景：
@@ -33,6 +33,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import glob
 import re
+import lammps_log
 from typing import List, Tuple
 
 # --------------------------
@@ -85,42 +86,17 @@ def load_and_merge_data(file_pattern: str) -> Tuple[np.ndarray, dict, List[float
     if not file_list:
         raise FileNotFoundError(f"未找到匹配的檔案: {file_pattern}")
 
-    # 初始化數據容器
-    data_columns = {
-        'temp': [], 'c_ex': [], 'c_in': [], 'c_PKAin': [],
-        'potEng': [], 'totEng': []
-    }
-    time_data = []
-    change_points = []
-    time_offset = 0.0
-
-    for idx, file_path in enumerate(file_list):
-        try:
-            data = np.loadtxt(file_path, skiprows=1)
-        except Exception as e:
-            print(f"加載檔案 {file_path} 時出錯: {str(e)}")
-            continue
-
-        # 處理時間偏移
-        current_time = data[:, 0] + time_offset
-        time_data.extend(current_time)
-        
-        # 記錄條件變化點
-        if idx > 0:
-            change_points.append(time_offset)
-        
-        # 累加時間偏移量
-        time_offset = current_time[-1]
-
-        # 收集各列數據
-        for i, key in enumerate(data_columns.keys(), start=4):
-            data_columns[key].extend(data[:, i])
+    # 一次配置合併後的陣列；時間接續前一檔最後的時間
+    df = lammps_log.concat_logs(file_list, offset_column=0, how="last")
+    if df.empty:
+        raise FileNotFoundError(f"沒有可讀取的檔案: {file_pattern}")
+    offsets = df.attrs["offsets"]
 
-    # 轉換為NumPy陣列
+    keys = ['temp', 'c_ex', 'c_in', 'c_PKAin', 'potEng', 'totEng']
     return (
-        np.array(time_data),
-        {k: np.array(v) for k, v in data_columns.items()},
-        change_points
+        df.iloc[:, 0].to_numpy(),
+        {k: df.iloc[:, i].to_numpy() for i, k in enumerate(keys, start=4)},
+        offsets[1:].tolist()
     )
 
 def create_figure(title: str, ylabel: str):
@@ -0,0 +1,943 @@
+#!/usr/bin/env python3
+"""
+lammps_dump.py: shared reader for LAMMPS custom dump files
+
+The first time a dump is opened, one pass over the file records for every
+frame its timestep, atom count, box bounds and the byte offset of its atom
+lines.  The table is saved next to the dump as `<dump>.idx.npz` and reused
+until the dump's size or mtime changes, so later runs (another --select,
+another cutoff, another script) seek straight to the frames they need.
+
+Usage from a script in this folder:
+  import lammps_dump
+  idx = lammps_dump.dump_index("dump.init_all")
+  for n, step, (types, xyz) in lammps_dump.iter_frames("dump.init_all",
+                                                      ["type", "xyz"]):
+      ...
+
+For dumps that are analysed many times, run once
+  python lammps_dump.py --to-cache dump.init_all dump.peak_all
+to write `<dump>.cols/` (int8 type, int32 id, float32 everything else,
+one binary file per column plus a frame table).  iter_frames() then reads
+frames as np.memmap slices and never touches the text again.
+
+Dumps written as `dump.*.gz`, `.zst` or `.xz` are read the same way: they
+are decompressed as a stream (by pigz/zstd/xz when available) and the
+index offsets refer to the decompressed text.
+
+Cascade runs that write one dump per stage (in.FLiBe: equil1, equil2,
+init, peak, final, each with its own timestep; see STAGE_LAYOUTS) can be chained with
+StagedTrajectory, which gives one frame numbering and one physical time
+axis over all stages without concatenating files.
+
+Column names are the labels of the “ITEM: ATOMS …” header
+(e.g. id type xu yu zu c_peInt c_keInt c_displacePKA[4]); "xyz" is a
+shortcut for the three xu/yu/zu (or x/y/z) columns as one (N,3) array.
+"""
+
+import gzip
+import io
+import itertools
+import lzma
+import os
+import shutil
+import subprocess
+import numpy as np
+
+INDEX_SUFFIX  = ".idx.npz"
+INDEX_VERSION = 2
+CACHE_SUFFIX  = ".cols"
+
+# 整數型欄位，其他欄位一律讀成 float
+INT_COLUMNS = {"id", "type", "mol", "proc", "procp1"}
+
+
+# ------------------------------------------------------------
+# 壓縮 dump (.gz / .zst / .xz)：串流解壓，不落地
+# ------------------------------------------------------------
+MAGIC = {
+    b"\x1f\x8b":             "gzip",
+    b"\x28\xb5\x2f\xfd":     "zstd",
+    b"\xfd7zXZ\x00":         "xz",
+}
+
+# 外部解壓程式在獨立進程 (pigz / xz 還會多執行緒) 解壓，主進程只管解析
+DECOMPRESS_CMDS = {
+    "gzip": [["pigz", "-dc"], ["gzip", "-dc"]],
+    "zstd": [["zstd", "-dcq", "-T0"]],
+    "xz":   [["xz", "-dc", "-T0"]],
+}
+
+
+def dump_codec(fname):
+    """"gzip", "zstd", "xz" or None, from the file's magic bytes."""
+    with open(fname, "rb") as fh:
+        head = fh.read(6)
+    for magic, codec in MAGIC.items():
+        if head.startswith(magic):
+            return codec
+    return None
+
+
+class _PipeReader:
+    """
+    Binary reader over an external decompressor's stdout.  Keeps its own
+    tell() and allows forward seeks (by reading), which is all the frame
+    index needs when frames are visited in order.
+    """
+    def __init__(self, cmd, fname):
+        self.proc = subprocess.Popen(cmd + [fname], stdout=subprocess.PIPE,
+                                     bufsize=1 << 20)
+        self.raw = self.proc.stdout
+        self.pos = 0
+
+    def readline(self):
+        line = self.raw.readline()
+        self.pos += len(line)
+        return line
+
+    def read(self, n=-1):
+        buf = self.raw.read(n)
+        self.pos += len(buf)
+        return buf
+
+    def __iter__(self):
+        for line in self.raw:
+            self.pos += len(line)
+            yield line
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence != 0 or offset < self.pos:
+            raise io.UnsupportedOperation("decompression pipe only seeks forward")
+        while self.pos < offset:
+            if not self.read(min(offset - self.pos, 1 << 20)):
+                break
+        return self.pos
+
+    def close(self):
+        self.raw.close()
+        self.proc.kill()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_dump(fname, external=True):
+    """
+    Open a dump for binary reading, decompressing gzip/zstd/xz on the fly.
+    With external=True a pigz/gzip/zstd/xz process does the decompression
+    (multithreaded where the codec allows it); otherwise, or when no such
+    program is on PATH, Python's gzip/lzma/zstandard modules are used.
+    Compressed streams are read forward only and never written to disk.
+    """
+    codec = dump_codec(fname)
+    if codec is None:
+        return open(fname, "rb")
+    if external:
+        for cmd in DECOMPRESS_CMDS[codec]:
+            if shutil.which(cmd[0]):
+                return _PipeReader(cmd, fname)
+    if codec == "gzip":
+        return gzip.open(fname, "rb")
+    if codec == "xz":
+        return lzma.open(fname, "rb")
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"{fname}: zstd dump needs the `zstd` program or "
+                          "the zstandard package")
+    reader = zstandard.ZstdDecompressor().stream_reader(open(fname, "rb"),
+                                                        closefd=True)
+    return io.BufferedReader(reader, 1 << 20)
+
+
+def _skip_lines(f, n):
+    """
+    Advance f past n lines without seeking back, so it also works on
+    compressed streams; False if the file ends (or is cut mid-line) first.
+    """
+    if n <= 0:
+        return True
+    for line in itertools.islice(f, n - 1, None):
+        return line.endswith(b"\n")
+    return False
+
+
+def build_dump_index(fname):
+    """
+    Scan a dump once and return its frame table as a dict of arrays:
+      step, natoms, offset (byte of “ITEM: TIMESTEP”),
+      atoms_offset / atoms_end (byte range of the atom lines),
+      box (nframe,3,2), box_flags, columns
+    A trailing frame that is still being written is left out.
+    """
+    steps, natoms, offsets, atom_offs, atom_ends, boxes = [], [], [], [], [], []
+    columns, flags = [], []
+    with open_dump(fname) as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if not line.startswith(b"ITEM: TIMESTEP"):
+                continue
+            start = f.tell() - len(line)
+            try:
+                step = int(f.readline())
+            except ValueError:
+                break
+            n, box, cols = None, np.zeros((3, 2)), None
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                if line.startswith(b"ITEM: NUMBER OF ATOMS"):
+                    n = int(f.readline())
+                elif line.startswith(b"ITEM: BOX BOUNDS"):
+                    flags = line.decode().split()[3:]
+                    for k in range(3):
+                        box[k] = [float(v) for v in f.readline().split()[:2]]
+                elif line.startswith(b"ITEM: ATOMS"):
+                    cols = line.decode().split()[2:]
+                    break
+            if cols is None or n is None:
+                break
+            atoms_at = f.tell()
+            if not _skip_lines(f, n):
+                break
+            if not columns:
+                columns = cols
+            steps.append(step); natoms.append(n)
+            offsets.append(start); atom_offs.append(atoms_at)
+            atom_ends.append(f.tell())
+            boxes.append(box)
+
+    return {
+        "step":         np.array(steps, dtype=np.int64),
+        "natoms":       np.array(natoms, dtype=np.int64),
+        "offset":       np.array(offsets, dtype=np.int64),
+        "atoms_offset": np.array(atom_offs, dtype=np.int64),
+        "atoms_end":    np.array(atom_ends, dtype=np.int64),
+        "box":          np.array(boxes, dtype=float).reshape(-1, 3, 2),
+        "box_flags":    np.array(flags, dtype=str),
+        "columns":      np.array(columns, dtype=str),
+    }
+
+
+def dump_index(fname, rebuild=False):
+    """
+    Return the frame table of fname, loading `<fname>.idx.npz` when it
+    still matches the dump's size/mtime and (re)building it otherwise.
+    """
+    st = os.stat(fname)
+    side = fname + INDEX_SUFFIX
+    if not rebuild and os.path.exists(side):
+        try:
+            with np.load(side) as z:
+                if (int(z["version"]) == INDEX_VERSION and
+                        int(z["src_size"]) == st.st_size and
+                        int(z["src_mtime_ns"]) == st.st_mtime_ns):
+                    return {k: z[k] for k in z.files
+                            if k not in ("version", "src_size", "src_mtime_ns")}
+        except (OSError, KeyError, ValueError):
+            pass
+
+    idx = build_dump_index(fname)
+    try:
+        with open(side, "wb") as out:
+            np.savez(out, version=INDEX_VERSION, src_size=st.st_size,
+                     src_mtime_ns=st.st_mtime_ns, **idx)
+    except OSError:
+        # 唯讀目錄：照樣用記憶體中的索引
+        pass
+    return idx
+
+
+def select_frames(idx, skip=1, select_ranges=None, xaxis="timestep"):
+    """
+    Frame numbers kept by --skip / --select, where select_ranges is a list
+    of (start, end) tuples on the x-axis (“timestep”, “frame”, or “time”
+    for a StagedTrajectory).
+    """
+    frames = np.arange(len(idx["step"]))
+    keep = frames % skip == 0
+    if select_ranges:
+        xval = {"frame": frames, "time": idx.get("time")}.get(xaxis, idx["step"])
+        hit = np.zeros(len(frames), dtype=bool)
+        for a, b in select_ranges:
+            hit |= (xval >= a) & (xval <= b)
+        keep &= hit
+    return frames[keep]
+
+
+def periodic_box(idx, n):
+    """
+    (lo, boxsize) of frame n for periodic neighbour search: boxsize is the
+    box length in periodic (pp) directions and 0 elsewhere, which is what
+    cKDTree(boxsize=…) expects.  None for triclinic boxes, whose bounds are
+    not the cell edges.
+    """
+    flags = [str(f) for f in idx.get("box_flags", [])]
+    if any(f in ("xy", "xz", "yz") for f in flags):
+        return None
+    box = idx["box"][n]
+    lo, length = box[:, 0].astype(float), (box[:, 1] - box[:, 0]).astype(float)
+    periodic = np.array([f == "pp" for f in flags]) if len(flags) == 3 \
+               else np.ones(3, dtype=bool)
+    return lo, np.where(periodic, length, 0.0)
+
+
+def wrap_positions(xyz, lo, boxsize):
+    """Shift unwrapped xu/yu/zu into [0, L) along every periodic direction."""
+    x = np.asarray(xyz, dtype=float) - lo
+    per = boxsize > 0
+    x[:, per] = np.mod(x[:, per], boxsize[per])
+    # mod() can round up to exactly L, which cKDTree rejects
+    x[:, per] = np.where(x[:, per] >= boxsize[per], 0.0, x[:, per])
+    return x
+
+
+def resolve_columns(header, columns):
+    """Map requested names (or "xyz") to positions in the ATOMS header."""
+    header = list(header)
+    pos = {name: i for i, name in enumerate(header)}
+    out = []
+    for name in columns:
+        if name == "xyz":
+            for trio in (("xu", "yu", "zu"), ("x", "y", "z")):
+                if all(c in pos for c in trio):
+                    out.append([pos[c] for c in trio])
+                    break
+            else:
+                raise KeyError(f"no xu/yu/zu or x/y/z columns in {header}")
+        elif name in pos:
+            out.append(pos[name])
+        else:
+            raise KeyError(f"column '{name}' not in dump header {header}")
+    return out
+
+
+def find_column(header, prefix, suffix=""):
+    """
+    First header label starting with prefix (and ending with suffix), e.g.
+    find_column(cols, "c_ke") → "c_kePKA" or "c_keInt".  The PKA dumps of
+    in.FLiBe do not all use the same column order, so readers go by name.
+    """
+    for name in header:
+        if name.startswith(prefix) and name.endswith(suffix):
+            return name
+    raise KeyError(f"no column matching '{prefix}*{suffix}' in {list(header)}")
+
+
+def parse_atom_block(buf, natom, usecols):
+    """
+    Convert the raw bytes of natom atom lines into a (natom, len(usecols))
+    float array with one C-level np.loadtxt call; only the listed columns
+    are converted, so non-numeric fields such as `element` are fine as long
+    as they are not requested.
+    """
+    if natom == 0:
+        return np.empty((0, len(usecols)))
+    return np.loadtxt(io.BytesIO(buf), usecols=usecols, ndmin=2,
+                      max_rows=natom, dtype=float)
+
+
+def read_frame(f, idx, n, columns, nrows=None):
+    """
+    Read the requested columns of frame n from an open binary file f.
+    The atom lines are read as one chunk and parsed in a single call.
+    nrows limits how many atom lines are read (e.g. 1 for a PKA dump).
+    Returns a list of arrays in the order of `columns`.
+    """
+    where = resolve_columns(idx["columns"], columns)
+    natom = int(idx["natoms"][n])
+    f.seek(int(idx["atoms_offset"][n]))
+    if nrows is not None and nrows < natom:
+        natom = nrows
+        buf = b"".join(f.readline() for _ in range(natom))
+    else:
+        buf = f.read(int(idx["atoms_end"][n] - idx["atoms_offset"][n]))
+
+    # 只轉換需要的欄位，再按 columns 的順序切出來
+    flat  = sorted({k for w in where for k in (w if isinstance(w, list) else [w])})
+    block = parse_atom_block(buf, natom, flat)
+    remap = {k: i for i, k in enumerate(flat)}
+
+    out = []
+    for name, w in zip(columns, where):
+        if isinstance(w, list):
+            col = block[:, [remap[k] for k in w]]
+        else:
+            col = block[:, remap[w]]
+            if name in INT_COLUMNS:
+                col = col.astype(np.int64)
+        out.append(np.ascontiguousarray(col))
+    return out
+
+
+# ------------------------------------------------------------
+# 二進位欄式快取 (<dump>.cols/)
+# ------------------------------------------------------------
+def _cache_dtype(name):
+    """type → int8, other integer fields → int32, everything else → float32."""
+    if name == "type":
+        return np.int8
+    if name in INT_COLUMNS:
+        return np.int32
+    return np.float32
+
+
+def convert_to_cache(fname, columns=None, out=None):
+    """
+    One-time conversion of a text dump into `<dump>.cols/`: one raw binary
+    file per column holding every frame back to back, plus `frames.npz`
+    with step, natoms, row_start (first row of each frame) and box.
+    Returns the cache directory.
+    """
+    idx = dump_index(fname)
+    header = list(idx["columns"])
+    columns = header if columns is None else list(columns)
+    resolve_columns(header, columns)
+    out = out or fname + CACHE_SUFFIX
+    os.makedirs(out, exist_ok=True)
+
+    row_start = np.concatenate([[0], np.cumsum(idx["natoms"])])
+    total  = int(row_start[-1])
+    files  = [f"col{header.index(c):02d}.bin" for c in columns]
+    dtypes = [np.dtype(_cache_dtype(c)).str for c in columns]
+    mms = [np.memmap(os.path.join(out, fn), dtype=dt, mode="w+", shape=(max(total, 1),))
+           for fn, dt in zip(files, dtypes)]
+
+    with open_dump(fname) as f:
+        for n in range(len(idx["step"])):
+            a, b = row_start[n], row_start[n + 1]
+            for mm, arr in zip(mms, read_frame(f, idx, n, columns)):
+                mm[a:b] = arr
+    for mm in mms:
+        mm.flush()
+    del mms
+
+    # frames.npz 最後才寫，轉換中斷時不會留下半套快取
+    st = os.stat(fname)
+    np.savez(os.path.join(out, "frames.npz"), version=INDEX_VERSION,
+             src_size=st.st_size, src_mtime_ns=st.st_mtime_ns,
+             step=idx["step"], natoms=idx["natoms"], row_start=row_start,
+             box=idx["box"], box_flags=idx["box_flags"],
+             header=np.array(header, dtype=str),
+             columns=np.array(columns, dtype=str), files=np.array(files, dtype=str),
+             dtypes=np.array(dtypes, dtype=str))
+    return out
+
+
+def open_cache(fname):
+    """
+    Open `<dump>.cols/` as a frame table whose "data" entry maps column
+    name → np.memmap.  Returns None when there is no cache, or when the
+    text dump still exists and has changed since the conversion.
+    """
+    out = fname + CACHE_SUFFIX
+    meta = os.path.join(out, "frames.npz")
+    if not os.path.exists(meta):
+        return None
+    with np.load(meta) as z:
+        tab = {k: z[k] for k in z.files}
+    if int(tab["version"]) != INDEX_VERSION:
+        return None
+    if os.path.exists(fname):
+        st = os.stat(fname)
+        if (int(tab["src_size"]) != st.st_size or
+                int(tab["src_mtime_ns"]) != st.st_mtime_ns):
+            return None
+    total = max(int(tab["row_start"][-1]), 1)
+    tab["data"] = {c: np.memmap(os.path.join(out, fn), dtype=np.dtype(dt),
+                                mode="r", shape=(total,))
+                   for c, fn, dt in zip(tab["columns"], tab["files"], tab["dtypes"])}
+    return tab
+
+
+def read_cached_frame(cache, n, columns, nrows=None):
+    """Same return value as read_frame, sliced straight out of the memmaps."""
+    data = cache["data"]
+    a, b = int(cache["row_start"][n]), int(cache["row_start"][n + 1])
+    if nrows is not None:
+        b = min(b, a + nrows)
+    where = resolve_columns(list(data), columns)
+    names = list(data)
+    out = []
+    for w in where:
+        if isinstance(w, list):
+            out.append(np.column_stack([data[names[k]][a:b] for k in w]))
+        else:
+            out.append(data[names[w]][a:b])
+    return out
+
+
+def cache_has(cache, columns):
+    """True if the cache holds every requested column (or "xyz" trio)."""
+    try:
+        resolve_columns(list(cache["data"]), columns)
+    except KeyError:
+        return False
+    return True
+
+
+def dump_columns(fname):
+    """
+    Labels of the dump's “ITEM: ATOMS …” header, also those left out of a
+    --columns cache (taken from the text index when the cache predates them).
+    """
+    cache = open_cache(fname)
+    if cache is not None and ("header" in cache or not os.path.exists(fname)):
+        return [str(c) for c in cache.get("header", cache["columns"])]
+    return [str(c) for c in dump_index(fname)["columns"]]
+
+
+def frame_table(fname, columns=None):
+    """
+    Frame table of fname: the binary cache if usable (and, when columns is
+    given, holding all of them), else the text index.
+    """
+    if isinstance(fname, StagedTrajectory):
+        return fname.table
+    cache = open_cache(fname)
+    if cache is not None and (columns is None or cache_has(cache, columns)):
+        return cache
+    return dump_index(fname)
+
+
+def iter_frames(fname, columns, skip=1, select_ranges=None, xaxis="timestep",
+                frames=None, nrows=None):
+    """
+    Yield (frame_idx, step, [arrays…]) for the frames picked by
+    --skip / --select (or an explicit list of frame numbers).  Frames come
+    from the `<dump>.cols/` memmaps when that cache exists, otherwise the
+    text is read by seeking straight to each frame through the index.
+    A cache written with --columns is only used when it holds every
+    requested column.  fname may also be a StagedTrajectory.
+    """
+    if isinstance(fname, StagedTrajectory):
+        yield from fname.iter_frames(columns, skip, select_ranges, xaxis,
+                                     frames, nrows)
+        return
+    cache = open_cache(fname)
+    if cache is not None and not cache_has(cache, columns):
+        # 快取只存了部分欄位：改走文字索引
+        cache = None
+    idx = cache if cache is not None else dump_index(fname)
+    if frames is None:
+        frames = select_frames(idx, skip, select_ranges, xaxis)
+    if cache is not None:
+        for n in frames:
+            yield int(n), int(idx["step"][n]), read_cached_frame(cache, n, columns, nrows)
+        return
+    with open_dump(fname) as f:
+        for n in frames:
+            yield int(n), int(idx["step"][n]), read_frame(f, idx, n, columns, nrows)
+
+
+def random_access(fname, columns):
+    """
+    True when frames of fname (every stage of a StagedTrajectory) can be
+    read starting anywhere: a usable cache or an uncompressed dump.  A
+    compressed dump is only read forward, so each reader that starts
+    mid-file decompresses everything before its first frame again.
+    """
+    if isinstance(fname, StagedTrajectory):
+        return all(random_access(st["file"], columns) for st in fname.stages)
+    cache = open_cache(fname)
+    if cache is not None and cache_has(cache, columns):
+        return True
+    return dump_codec(fname) is None
+
+
+# ------------------------------------------------------------
+# 多階段串接：equil1 → equil2 → init → peak → final
+# ------------------------------------------------------------
+# 各輸入檔的階段 dump 檔名與時間步長 (ps)；可直接增改，或傳 layouts= 給 parse_stages
+STAGE_LAYOUTS = {
+    # in.FLiBe
+    "flibe": [
+        ("equil1", "dump.equil1_{group}", 0.001),
+        ("equil2", "dump.equil2_{group}", 0.001),
+        ("init",   "dump.init_{group}",   0.00001),
+        ("peak",   "dump.peak_{group}",   0.0001),
+        ("final",  "dump.final_{group}",  0.0001),
+    ],
+    # in.FLiBe-New-Region：碰撞段分成細/粗輸出兩段，時間步長不變
+    "flibe-new-region": [
+        ("equil1", "dump.equil1_{group}", 0.001),
+        ("equil2", "dump.equil2_{group}", 0.001),
+        ("init",   "dump.init_{group}",   0.00001),
+        ("init2",  "dump.init2_{group}",  0.00001),
+    ],
+}
+FLIBE_STAGES = STAGE_LAYOUTS["flibe"]
+
+# 兩個輸入檔都把 equil2 的 PKA dump 寫成 dump.equal2_PKA
+STAGE_FILE_ALIASES = {"dump.equil2_PKA": "dump.equal2_PKA"}
+
+
+def parse_stages(txt, layouts=None):
+    """
+    "init:dump.init_all:0.00001,peak:dump.peak_all:0.0001" → stage list,
+    or "<layout>:<group>" for a layout of STAGE_LAYOUTS (or of `layouts`),
+    e.g. flibe:interior or flibe-new-region:PKA.
+    """
+    layouts = STAGE_LAYOUTS if layouts is None else layouts
+    head, _, rest = txt.partition(":")
+    if head in layouts and ":" not in rest:
+        out = []
+        for name, pat, dt in layouts[head]:
+            fname = pat.format(group=rest)
+            alias = STAGE_FILE_ALIASES.get(fname)
+            if alias and not os.path.exists(fname) and os.path.exists(alias):
+                fname = alias
+            out.append((name, fname, dt))
+        return out
+    out = []
+    for item in txt.split(","):
+        name, fname, dt = item.split(":")
+        out.append((name, fname, float(dt)))
+    return out
+
+
+class StagedTrajectory:
+    """
+    One virtual trajectory over the per-stage dumps of a cascade run.
+
+    stages is a list of (name, dump file, dt in ps).  LAMMPS keeps counting
+    steps across runs, so each stage starts where the previous one ended
+    and physical time is accumulated with that stage's own dt.  The first
+    frame of a stage repeats the last frame of the previous one and is
+    dropped (drop_duplicates=True).  Only the frame tables are loaded up
+    front; atom data is read lazily from each stage's dump by the same
+    reader as a single file.
+
+    .table   step, time (ps), stage, local (frame number inside the stage
+             file), natoms, box — one entry per global frame
+    .stages  per stage: name, file, dt, first/last global frame,
+             first/last step, t_start/t_end
+    Stages whose dump (and cache) is missing are skipped with a warning.
+    """
+    def __init__(self, stages, drop_duplicates=True):
+        self.stages = []
+        cols = {k: [] for k in ("step", "time", "stage", "local", "natoms", "box")}
+        t0, prev = 0.0, None
+        for k, (name, fname, dt) in enumerate(stages):
+            if not os.path.exists(fname) and not os.path.exists(fname + CACHE_SUFFIX):
+                print(f"{fname}: not found, stage '{name}' skipped")
+                continue
+            tab = frame_table(fname)
+            steps = tab["step"]
+            if len(steps) == 0:
+                continue
+            lo = 0
+            if prev is not None:
+                t0 += (steps[0] - prev["step_first"]) * prev["dt"]
+                if drop_duplicates and steps[0] == prev["step_last"]:
+                    lo = 1
+            time = t0 + (steps - steps[0]) * dt
+            first = sum(len(c) for c in cols["step"])
+            st = {
+                "name": name, "file": fname, "dt": dt,
+                "frame_first": first, "frame_last": first + len(steps) - lo - 1,
+                "step_first": int(steps[0]), "step_last": int(steps[-1]),
+                "t_start": float(time[0]),
+                "t_end": float(time[-1]),
+            }
+            self.stages.append(st)
+            cols["step"].append(steps[lo:])
+            cols["time"].append(time[lo:])
+            cols["stage"].append(np.full(len(steps) - lo, len(self.stages) - 1))
+            cols["local"].append(np.arange(lo, len(steps)))
+            cols["natoms"].append(tab["natoms"][lo:])
+            cols["box"].append(tab["box"][lo:])
+            prev = st
+        if not self.stages:
+            raise ValueError("no frames found in any stage dump")
+        self.table = {k: np.concatenate(v) for k, v in cols.items()}
+        self.table["box_flags"] = frame_table(self.stages[0]["file"])["box_flags"]
+
+    def __len__(self):
+        return len(self.table["step"])
+
+    def boundaries(self, xaxis="timestep"):
+        """x positions where stages 2…n begin, for axvline()."""
+        key = {"frame": "frame_first", "time": "t_start"}.get(xaxis, "step_first")
+        return [st[key] for st in self.stages[1:]]
+
+    def iter_frames(self, columns, skip=1, select_ranges=None, xaxis="timestep",
+                    frames=None, nrows=None):
+        """Same as lammps_dump.iter_frames, with global frame numbers."""
+        if frames is None:
+            frames = select_frames(self.table, skip, select_ranges, xaxis)
+        frames = np.asarray(frames)
+        stage = self.table["stage"][frames]
+        for k, st in enumerate(self.stages):
+            mine = frames[stage == k]
+            if len(mine) == 0:
+                continue
+            local = self.table["local"][mine]
+            for n, (_, step, data) in zip(mine, iter_frames(st["file"], columns,
+                                                            frames=local, nrows=nrows)):
+                yield int(n), step, data
+
+
+# ------------------------------------------------------------
+# 單原子 (PKA) 軌跡
+# ------------------------------------------------------------
+def _stream_pka_lines(fname, atom_id):
+    """
+    Stream fname and collect one atom line per frame.  Returns (steps,
+    lines, header, missing), missing counting frames without atom_id.
+    """
+    steps, lines, cols, i_id, missing = [], [], None, None, 0
+    with open_dump(fname) as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            if not line.startswith(b"ITEM: TIMESTEP"):
+                continue
+            step, natom = int(f.readline()), None
+            while True:
+                line = f.readline()
+                if not line or line.startswith(b"ITEM: ATOMS"):
+                    break
+                if line.startswith(b"ITEM: NUMBER OF ATOMS"):
+                    natom = int(f.readline())
+            if not line or not natom:
+                continue
+            if cols is None:
+                cols = line.decode().split()[2:]
+                i_id = cols.index("id") if atom_id is not None else None
+
+            # 只讀到 PKA 那一行，剩下的原子行整段跳過
+            left, hit, cut = natom, None, False
+            while left:
+                atom = f.readline()
+                left -= 1
+                if not atom.endswith(b"\n"):
+                    cut = True
+                    break
+                if i_id is None or int(atom.split()[i_id]) == atom_id:
+                    hit = atom
+                    break
+            # 檔尾還在寫的半帧才停；找不到 atom_id 的帧跳過
+            if cut or not _skip_lines(f, left):
+                break
+            if hit is None:
+                missing += 1
+                continue
+            steps.append(step)
+            lines.append(hit)
+    return steps, lines, cols, missing
+
+
+def read_pka_trajectory(fname, timestep_fs=0.01, atom_id=None,
+                        ke_col=None, pe_col=None, disp_col=None):
+    """
+    One atom line per frame (the first line, or the line whose id is
+    atom_id) of a PKA dump.  When `<dump>.cols/` or `<dump>.idx.npz`
+    exists the frames are read through iter_frames() (only the first atom
+    line of each frame without atom_id); otherwise the text is streamed
+    once and every other atom line is skipped without being split.
+    Frames that do not contain atom_id are skipped.  Columns are found by
+    name in “ITEM: ATOMS …”: by default c_ke*, c_pe* and c_displace*[4].
+    Returns a dict of arrays:
+      step, time (ps), xyz (nframe,3), ke, pe, disp (absent columns → None)
+    """
+    indexed = open_cache(fname) is not None or os.path.exists(fname + INDEX_SUFFIX)
+    if indexed:
+        cols = dump_columns(fname)
+    else:
+        steps, lines, cols, missing = _stream_pka_lines(fname, atom_id)
+        if cols is None:
+            raise ValueError(f"{fname}: no complete frame found")
+
+    names = {"xyz": "xyz"}
+    for key, name, pre, suf in (("ke", ke_col, "c_ke", ""),
+                                ("pe", pe_col, "c_pe", ""),
+                                ("disp", disp_col, "c_displace", "[4]")):
+        try:
+            names[key] = name or find_column(cols, pre, suf)
+        except KeyError:
+            names[key] = None
+    keys = [k for k in ("xyz", "ke", "pe", "disp") if names[k]]
+    want = [names[k] for k in keys]
+
+    if indexed:
+        steps, rows, missing = [], [[] for _ in keys], 0
+        extra = ["id"] if atom_id is not None else []
+        for _, step, data in iter_frames(fname, want + extra,
+                                         nrows=1 if atom_id is None else None):
+            if atom_id is None:
+                hit = np.arange(min(len(data[0]), 1))
+            else:
+                hit = np.nonzero(data[-1] == atom_id)[0][:1]
+            if len(hit) == 0:
+                missing += 1
+                continue
+            steps.append(step)
+            for r, d in zip(rows, data):
+                r.append(d[hit[0]])
+        values = [np.asarray(r, dtype=float) for r in rows]
+    else:
+        where = resolve_columns(cols, want)
+        flat  = sorted({k for w in where for k in (w if isinstance(w, list) else [w])})
+        block = parse_atom_block(b"".join(lines), len(lines), flat)
+        remap = {k: i for i, k in enumerate(flat)}
+        values = [block[:, [remap[k] for k in w]] if isinstance(w, list)
+                  else block[:, remap[w]] for w in where]
+
+    if missing:
+        what = f"atom id {atom_id}" if atom_id is not None else "atom lines"
+        print(f"{fname}: {missing} frames without {what}, skipped")
+    steps = np.array(steps, dtype=np.int64)
+    out = {"step": steps, "time": steps * timestep_fs * 0.001,
+           "ke": None, "pe": None, "disp": None}
+    for key, v in zip(keys, values):
+        out[key] = v.reshape(len(steps), 3) if key == "xyz" else v
+    return out
+
+
+# ------------------------------------------------------------
+# 跟隨模式：分析仍在寫入中的 dump
+# ------------------------------------------------------------
+def _read_complete_frame(f, columns, want=None):
+    """
+    Try to read one whole frame at f's position.  Returns
+    (step, [arrays…], box) or None, in which case f is put back where it
+    was so the half-written frame can be retried once LAMMPS has finished
+    it.  box is a one-frame table {"box", "box_flags"} for periodic_box().
+    When want(step) is False the atom lines are skipped unparsed and
+    (step, None, box) is returned.
+    """
+    start = f.tell()
+
+    def line_or_none():
+        line = f.readline()
+        return line if line.endswith(b"\n") else None
+
+    while True:
+        line = line_or_none()
+        if line is None:
+            f.seek(start)
+            return None
+        if line.startswith(b"ITEM: TIMESTEP"):
+            break
+        start = f.tell()
+
+    step = natom = cols = None
+    box = {"box": np.zeros((1, 3, 2)), "box_flags": np.array([], dtype=str)}
+    while cols is None:
+        line = line_or_none()
+        if line is None:
+            f.seek(start)
+            return None
+        if step is None:
+            step = int(line)
+        elif line.startswith(b"ITEM: NUMBER OF ATOMS"):
+            line = line_or_none()
+            if line is None:
+                f.seek(start)
+                return None
+            natom = int(line)
+        elif line.startswith(b"ITEM: BOX BOUNDS"):
+            box["box_flags"] = np.array(line.decode().split()[3:], dtype=str)
+            for k in range(3):
+                line = line_or_none()
+                if line is None:
+                    f.seek(start)
+                    return None
+                box["box"][0, k] = [float(v) for v in line.split()[:2]]
+        elif line.startswith(b"ITEM: ATOMS"):
+            cols = line.decode().split()[2:]
+
+    lines = list(itertools.islice(f, natom))
+    if len(lines) < natom or (natom and not lines[-1].endswith(b"\n")):
+        f.seek(start)
+        return None
+    if want is not None and not want(step):
+        return step, None, box
+
+    where = resolve_columns(cols, columns)
+    flat  = sorted({k for w in where for k in (w if isinstance(w, list) else [w])})
+    block = parse_atom_block(b"".join(lines), natom, flat)
+    remap = {k: i for i, k in enumerate(flat)}
+    out = []
+    for name, w in zip(columns, where):
+        if isinstance(w, list):
+            out.append(block[:, [remap[k] for k in w]])
+        else:
+            col = block[:, remap[w]]
+            out.append(col.astype(np.int64) if name in INT_COLUMNS else col)
+    return step, out, box
+
+
+def follow_frames(fname, columns, skip=1, select_ranges=None, xaxis="timestep",
+                  poll=30.0, idle_timeout=None, with_box=False):
+    """
+    Like iter_frames, but for a dump that LAMMPS is still writing: the file
+    stays open, only newly appended complete frames are parsed, and a
+    half-written last frame is retried on the next poll.  Yields
+    (frame_idx, step, [arrays…]) and yields None whenever it has caught up
+    with the writer (the caller's cue to refresh its outputs) before
+    sleeping `poll` seconds.  Stops after idle_timeout seconds without a
+    new frame (None = follow until Ctrl-C).  With with_box=True each
+    frame is (frame_idx, step, [arrays…], box) where box is a one-frame
+    table for periodic_box(box, 0).
+    """
+    import time
+    idx, idle = 0, 0.0
+
+    def want(step):
+        xval = idx if xaxis == "frame" else step
+        if idx % skip:
+            return False
+        return not select_ranges or any(a <= xval <= b for a, b in select_ranges)
+
+    with open(fname, "rb") as f:
+        while True:
+            got = _read_complete_frame(f, columns, want)
+            if got is None:
+                yield None
+                if idle_timeout is not None and idle >= idle_timeout:
+                    return
+                time.sleep(poll)
+                idle += poll
+                continue
+            idle = 0.0
+            step, data, box = got
+            n, idx = idx, idx + 1
+            if data is not None:
+                yield (n, step, data, box) if with_box else (n, step, data)
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(
+        description="Build the frame index or the binary column cache of LAMMPS dumps"
+    )
+    p.add_argument("dumps", nargs="+", help="LAMMPS dump files")
+    p.add_argument("--to-cache", action="store_true",
+                   help="Convert each dump into <dump>.cols/ for np.memmap access")
+    p.add_argument("--columns", default=None,
+                   help="Columns to keep in the cache, e.g. id,type,xu,yu,zu (default: all)")
+    args = p.parse_args()
+    columns = args.columns.split(",") if args.columns else None
+    for fn in args.dumps:
+        idx = dump_index(fn, rebuild=True)
+        print(f"{fn}: {len(idx['step'])} frames, columns {' '.join(idx['columns'])}")
+        if args.to_cache:
+            print(f"  → {convert_to_cache(fn, columns)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+lammps_log.py: shared reader for LAMMPS thermo output (log.lammps)
+
+Every `run` / `minimize` prints one thermo block: a header line whose
+first keyword is Step (or v_simTime for in.FLiBe's thermo_style), the
+thermo rows, and a closing “Loop time of …” line.  find_blocks() locates
+all headers of a log with one regex pass over the raw bytes; each block is
+then parsed in one call to pandas' C reader with the header names as
+column names, after WARNING lines and other non-numeric lines inside the
+block have been dropped.  No line counts have to be given: the input
+script echo, the setup output and the timing summary between runs are
+skipped because they are outside any block.
+
+Usage from a script in this folder (or with this folder on PYTHONPATH):
+  import lammps_log
+  runs = lammps_log.read_runs("log.lammps")      # one DataFrame per run
+  df   = lammps_log.read_thermo("log.lammps")    # all runs, one table
+  t, rho = df["Step"].to_numpy(), df["Density"].to_numpy()
+
+The same functions read thermo tables already cut out of a log (log-1.txt
+…, data.log, with or without `==> file <==` lines from head/tail).  A file
+without any header line is read positionally and named after `columns`.
+
+Repeated keywords in one thermo_style (e.g. `press press`) are renamed
+pandas-style to Press, Press.1.
+
+Stage logs (log-1.txt, log-2.txt … or flibe_equil_*.txt) are glued into one
+table by concat_logs(), which preallocates every output column once, shifts
+Step / v_simTime by the accumulated end value of the previous files and
+tags each row with a categorical `source_file`:
+  df = lammps_log.concat_logs(files, "v_simTime", offset_to="convert_simTime")
+  df.attrs["starts"]     # first row of each file (plus the total length)
+
+Stage (run) boundaries are found from the data rather than typed in:
+stage_boundaries(df) returns the rows where Dt changes, where Step /
+Elapsed / v_simTime fall back, where the slope of v_simTime per step
+jumps, or where source_file changes; stage_positions(df, "Step") gives
+the matching x values for axvline().  concat_logs() stores the rows in
+df.attrs["stages"].
+
+The parsed runs are saved next to the log as `<log>.thermo.npz` and reused
+as long as the log's size, mtime and the hash of its first and last 64 kB
+are unchanged, so re-plotting with other options does not parse the text
+again.  To build the caches ahead of time:
+  python lammps_log.py log.lammps log-*.txt
+"""
+
+import hashlib
+import io
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+
+HEADER_KEYS = ("Step", "v_simTime")
+# 沒有標頭行的 thermo 表依此順序命名 (in.lammps: thermo_style custom step temp press vol density pe ke etotal)
+THERMO_COLUMNS = ["Step", "Temp", "Press", "Volume", "Density", "PotEng", "KinEng", "TotEng"]
+
+CACHE_SUFFIX  = ".thermo.npz"
+CACHE_VERSION = 2
+# 指紋只讀頭尾各 64 kB，不必為了檢查快取把整個 log 讀一遍
+FINGERPRINT_BYTES = 1 << 16
+
+_LOOP   = b"\nLoop time"
+# 不以數字、正負號或小數點開頭的行（WARNING、==> 等），nan/inf 開頭的除外
+# (模擬發散時 LAMMPS 印的就是 nan)；以 "\n" 開頭，re 可以直接跳到換行處
+# 比對（^ 搭配 re.M 會逐字元嘗試）
+_NOT_ROW = re.compile(rb"\n[ \t]*(?!(?i:nan|inf)\b)[^-+.\d\s][^\n]*")
+_DATA   = re.compile(rb"\S")
+_NUMBER = re.compile(rb"[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?|[-+]?(nan|inf)", re.I)
+
+
+def _unique_names(names):
+    seen = {}
+    out = []
+    for n in names:
+        k = seen.get(n, 0)
+        out.append(n if k == 0 else f"{n}.{k}")
+        seen[n] = k + 1
+    return out
+
+
+def _header_lines(buf):
+    """(start, end) of every Step/v_simTime header line, in file order."""
+    found = []
+    for key in HEADER_KEYS:
+        k = key.encode()
+        pos = buf.find(k)
+        # 關鍵字出現的次數很少：用 bytes.find 跳過去，再確認它在行首
+        while pos >= 0:
+            start = buf.rfind(b"\n", 0, pos) + 1
+            end = buf.find(b"\n", pos)
+            end = len(buf) if end < 0 else end
+            line = buf[start:end].split()
+            if line and line[0] == k and len(line) > 1 \
+                    and not any(_NUMBER.fullmatch(t) for t in line):
+                found.append((start, end))
+            pos = buf.find(k, end)
+    return sorted(found)
+
+
+def find_blocks(buf, names=None):
+    """
+    Split log text (bytes) into thermo blocks.
+
+    Returns (blocks, names_open): blocks is a list of (column names, body
+    bytes) and names_open the header still open at the end of buf (None
+    if the last block was closed by “Loop time”).  Rows before the first
+    header of buf belong to `names` when given (used by follow_thermo).
+    """
+    # 每段 body 都以 "\n" 開頭（標頭行結尾的換行），buf 開頭則補一個
+    buf = b"\n" + buf
+    raw = []
+    pos = 0
+    for start, end in _header_lines(buf):
+        if names is not None:
+            raw.append((names, buf[pos:start]))
+        names = _unique_names(t.decode() for t in buf[start:end].split())
+        pos = end
+    if names is not None:
+        raw.append((names, buf[pos:]))
+
+    blocks = []
+    for i, (cols, body) in enumerate(raw):
+        k = body.find(_LOOP)
+        if k >= 0:
+            body = body[:k]
+            if i == len(raw) - 1:
+                names = None
+        blocks.append((cols, body))
+    return blocks, names
+
+
+def _field_counts(body):
+    """Number of fields on each non-blank line of body, in one numpy pass."""
+    a = np.frombuffer(body, dtype=np.uint8)
+    if len(a) == 0:
+        return np.empty(0, dtype=np.int64)
+    blank = (a == 32) | (a == 9) | (a == 10) | (a == 13)
+    first = ~blank & np.concatenate([[True], blank[:-1]])
+    line = np.cumsum(a == 10)
+    counts = np.bincount(line[first], minlength=int(line[-1]) + 1)
+    return counts[counts > 0]
+
+
+def parse_block(names, body):
+    """
+    Thermo rows of one block (bytes) as a DataFrame with the given columns.
+    nan / inf values are kept; rows with fewer fields than names (cut off
+    mid-line) are dropped.
+    """
+    body = _NOT_ROW.sub(b"", body if body.startswith(b"\n") else b"\n" + body)
+    # 仍在寫入的 log：最後一行可能只寫了一半
+    if body and not body.endswith(b"\n"):
+        cut = body.rfind(b"\n") + 1
+        if len(body[cut:].split()) != len(names):
+            body = body[:cut]
+    if _DATA.search(body) is None:
+        return pd.DataFrame(np.empty((0, len(names))), columns=names)
+    df = pd.read_csv(io.BytesIO(body), sep=r"\s+", header=None, names=names,
+                     index_col=False, on_bad_lines="skip")
+    # 欄位不足的行最後一欄會被補成 NaN；但 NaN 也可能是 log 裡真的 nan，
+    # 所以只在有 NaN 時按欄位數找出被截斷的行（欄位過多的行 read_csv 已跳過）
+    if df.iloc[:, -1].isna().any():
+        n = _field_counts(body)
+        n = n[n <= len(names)]
+        if len(n) == len(df):
+            df = df[n == len(names)].reset_index(drop=True)
+    return df
+
+
+def _read_bytes(path, skip_lines=0):
+    with open(path, "rb") as f:
+        buf = f.read()
+    pos = 0
+    for _ in range(skip_lines):
+        pos = buf.find(b"\n", pos) + 1
+        if pos == 0:
+            return b""
+    return buf[pos:]
+
+
+def _positional(buf, columns):
+    body = _NOT_ROW.sub(b"", b"\n" + buf)
+    first = body.lstrip().split(b"\n", 1)[0].split()
+    df = parse_block(list(range(len(first))), body) if first else pd.DataFrame()
+    if columns:
+        df.columns = [columns[i] if i < len(columns) else i for i in range(df.shape[1])]
+    return df
+
+
+def _parse_runs(buf):
+    blocks, _ = find_blocks(buf)
+    if not blocks:
+        df = _positional(buf, None)
+        return ([df] if len(df) else []), True
+    return [parse_block(names, body) for names, body in blocks], False
+
+
+def log_key(path, skip_lines=0):
+    """Cache key of a log: size, mtime, skip_lines and a head/tail hash."""
+    st = os.stat(path)
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        h.update(f.read(FINGERPRINT_BYTES))
+        if st.st_size > FINGERPRINT_BYTES:
+            f.seek(max(st.st_size - FINGERPRINT_BYTES, FINGERPRINT_BYTES))
+            h.update(f.read(FINGERPRINT_BYTES))
+    return f"{st.st_size}:{st.st_mtime_ns}:{skip_lines}:{h.hexdigest()}"
+
+
+def _load_cache(side, key):
+    try:
+        with np.load(side, allow_pickle=False) as z:
+            if int(z["version"]) != CACHE_VERSION or str(z["key"]) != key:
+                return None
+            positional = bool(z["positional"])
+            runs = []
+            for i in range(int(z["nrun"])):
+                names = [str(n) for n in z[f"names{i}"]]
+                if positional:
+                    names = [int(n) for n in names]
+                runs.append(pd.DataFrame({n: z[f"r{i}c{j}"] for j, n in enumerate(names)},
+                                         columns=names, copy=False))
+            return runs, positional
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _save_cache(side, key, runs, positional):
+    # 非數值欄位（解析失敗的 object 欄）不寫快取，下次照常解析
+    if any(dt.kind not in "biuf" for r in runs for dt in r.dtypes):
+        return
+    arrays = {}
+    for i, r in enumerate(runs):
+        arrays[f"names{i}"] = np.array([str(n) for n in r.columns], dtype=str)
+        for j, n in enumerate(r.columns):
+            arrays[f"r{i}c{j}"] = r[n].to_numpy()
+    try:
+        with open(side, "wb") as out:
+            np.savez(out, version=CACHE_VERSION, key=key, positional=positional,
+                     nrun=len(runs), **arrays)
+    except OSError:
+        # 唯讀目錄：照樣用記憶體中的表
+        pass
+
+
+def read_runs(path, columns=None, skip_lines=0, cache=True, rebuild=False):
+    """
+    One DataFrame per thermo block of the log, in file order.
+
+    A file without any Step/v_simTime header is returned as a single
+    table of its numeric lines, named positionally after `columns`.
+    skip_lines drops that many lines at the top of the file first.
+    With cache=True the runs are kept in `<path>.thermo.npz`.
+    """
+    side = path + CACHE_SUFFIX
+    key = log_key(path, skip_lines) if cache else None
+    loaded = _load_cache(side, key) if cache and not rebuild and os.path.exists(side) else None
+    if loaded is None:
+        runs, positional = _parse_runs(_read_bytes(path, skip_lines))
+        if cache:
+            _save_cache(side, key, runs, positional)
+    else:
+        runs, positional = loaded
+    if positional and columns:
+        for r in runs:
+            r.columns = [columns[i] if i < len(columns) else i for i in range(r.shape[1])]
+    return runs
+
+
+def concat_runs(runs, columns=None):
+    """All runs as one table (columns missing from a run are NaN)."""
+    runs = [r for r in runs if len(r)]
+    if not runs:
+        return pd.DataFrame(columns=columns or [])
+    if len(runs) == 1:
+        return runs[0]
+    return pd.concat(runs, ignore_index=True, sort=False)
+
+
+def read_thermo(path, columns=None, skip_lines=0, cache=True):
+    """Thermo rows of every run of the log in one DataFrame."""
+    return concat_runs(read_runs(path, columns, skip_lines, cache), columns)
+
+
+def concat_logs(paths, offset_column=None, offset_to=None, how="max",
+                require=None, read=None):
+    """
+    Concatenate the thermo tables of several logs, in the given order.
+
+    offset_column (name, or position in the first table) is continued
+    across files: file k is shifted by the sum of the max (how="max") or
+    last (how="last") value of that column over files 0..k-1.  The
+    shifted values go to offset_to (default: offset_column in place).
+    Files that cannot be read or lack the `require` column are reported
+    and skipped.  read(path) → DataFrame defaults to read_thermo.
+
+    The result has the union of the columns (NaN where a file lacks one)
+    and a categorical `source_file` (file basenames); df.attrs holds
+    "files", "offsets", "starts" (row index where each file begins,
+    plus the total length) and "stages" (see stage_boundaries).
+    """
+    read = read or read_thermo
+    files, tables = [], []
+    for path in paths:
+        try:
+            df = read(path)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {path}: {e}")
+            continue
+        if require is not None and require not in df.columns:
+            print(f"File {path} does not contain '{require}' column. Skipping.")
+            continue
+        files.append(path)
+        tables.append(df)
+    if not tables:
+        return pd.DataFrame()
+
+    lens = np.array([len(t) for t in tables])
+    starts = np.concatenate([[0], np.cumsum(lens)])
+    names = list(dict.fromkeys(c for t in tables for c in t.columns))
+
+    # 每個欄位只配置一次，逐檔複製進對應的區段
+    out = {}
+    for name in names:
+        have = [t[name].dtype for t in tables if name in t.columns]
+        dtype = np.result_type(*have)
+        if len(have) < len(tables) and dtype.kind in "biu":
+            dtype = np.dtype(float)
+        col = np.empty(starts[-1], dtype=dtype)
+        for k, t in enumerate(tables):
+            col[starts[k]:starts[k + 1]] = t[name].to_numpy() if name in t.columns else np.nan
+        out[name] = col
+    del tables
+
+    offsets = np.zeros(len(files))
+    if offset_column is not None:
+        if isinstance(offset_column, int):
+            offset_column = names[offset_column]
+        src = out[offset_column]
+        nonempty = lens > 0
+        end = np.zeros(len(files))
+        if how == "max":
+            end[nonempty] = np.fmax.reduceat(src, starts[:-1][nonempty])
+        else:
+            end[nonempty] = src[starts[1:][nonempty] - 1]
+        offsets[1:] = np.cumsum(end)[:-1]
+        out[offset_to or offset_column] = src + np.repeat(offsets, lens).astype(src.dtype)
+
+    base = [os.path.basename(p) for p in files]
+    labels = base if len(set(base)) == len(base) else [f"{b}#{k}" for k, b in enumerate(base)]
+    codes = np.repeat(np.arange(len(files), dtype=np.int16 if len(files) < 2**15 else np.int32), lens)
+    out["source_file"] = pd.Categorical.from_codes(codes, categories=labels)
+
+    df = pd.DataFrame(out, copy=False)
+    df.attrs.update(files=files, offsets=offsets, starts=starts,
+                    stages=stage_boundaries(df))
+    return df
+
+
+def _column(df, name):
+    """Column by case-insensitive name as a float array (None if absent)."""
+    for c in df.columns:
+        if str(c).lower() == name:
+            return df[c].to_numpy(dtype=float)
+    return None
+
+
+def stage_boundaries(df, rtol=0.05, min_gap=2):
+    """
+    Rows of a (concatenated) thermo table where a new stage begins.
+
+    A row starts a stage when, relative to the previous row, Dt changes,
+    Step, Elapsed or v_simTime decreases (a new run or a new file),
+    source_file changes, or the slope d(v_simTime)/d(Step) differs from
+    that of the previous interval by more than rtol.  Boundaries closer
+    than min_gap rows are merged (LAMMPS repeats the last step of a run
+    as the first row of the next one).
+
+    Rows without Dt (the `run 0` / `minimize` blocks printed with the
+    default thermo header before the staged runs) are left out.
+    """
+    dt = _column(df, "dt")
+    if dt is not None and np.isfinite(dt).any() and not np.isfinite(dt).all():
+        # 只在有 Dt 的行之間找分界，再換回原本的行號
+        keep = np.nonzero(np.isfinite(dt))[0]
+        return keep[stage_boundaries(df.iloc[keep], rtol, min_gap)]
+
+    n = len(df)
+    new = np.zeros(n, dtype=bool)
+    if n < 2:
+        return np.nonzero(new)[0]
+
+    if dt is not None:
+        new[1:] |= ~np.isclose(dt[1:], dt[:-1], rtol=1e-6, atol=0, equal_nan=True)
+    for name in ("step", "elapsed", "v_simtime"):
+        v = _column(df, name)
+        if v is not None:
+            new[1:] |= v[1:] < v[:-1]
+    if "source_file" in df.columns:
+        src = np.asarray(df["source_file"])
+        new[1:] |= src[1:] != src[:-1]
+
+    t, step = _column(df, "v_simtime"), _column(df, "step")
+    if t is not None and step is not None:
+        ds, dtime = np.diff(step), np.diff(t)
+        # NaN 的間隔 (缺 v_simTime 或 Step) 不參與比較
+        ok = np.nonzero((ds > 0) & (dtime >= 0) & np.isfinite(ds) & np.isfinite(dtime))[0]
+        r = dtime[ok] / ds[ok]
+        jump = ~np.isclose(r[1:], r[:-1], rtol=rtol, atol=0)
+        # 新斜率從第 ok[j] 行開始
+        new[ok[1:][jump]] = True
+
+    rows = np.nonzero(new)[0]
+    if len(rows) > 1 and min_gap > 1:
+        keep = [rows[0]]
+        for r in rows[1:]:
+            if r - keep[-1] >= min_gap:
+                keep.append(r)
+        rows = np.array(keep)
+    return rows
+
+
+def stage_positions(df, x="Step", rows=None):
+    """x values at the first row of each stage after the first (for axvline)."""
+    if rows is None:
+        rows = df.attrs.get("stages")
+        if rows is None:
+            rows = stage_boundaries(df)
+    return df[x].to_numpy()[np.asarray(rows, dtype=int)]
+
+
+def follow_thermo(path, poll=30.0, columns=None, skip_lines=0):
+    """
+    Keep the log open while LAMMPS writes it and yield a DataFrame of the
+    thermo rows appended since the last poll (empty polls are skipped).
+    An incomplete last line is kept for the next poll.
+    """
+    with open(path, "rb") as f:
+        for _ in range(skip_lines):
+            f.readline()
+        pending = b""
+        names = None
+        bare = None     # 沒有標頭、第一行就是數字的 thermo 表
+        while True:
+            chunk = f.read()
+            if chunk:
+                text = pending + chunk
+                cut = text.rfind(b"\n") + 1
+                text, pending = text[:cut], text[cut:]
+                if bare is None and text.strip():
+                    bare = _NOT_ROW.match(b"\n" + text.lstrip()) is None
+                if bare:
+                    runs = [_positional(text, columns)]
+                else:
+                    blocks, names = find_blocks(text, names)
+                    runs = [parse_block(n, b) for n, b in blocks]
+                df = concat_runs(runs, columns)
+                if len(df):
+                    yield df
+            time.sleep(poll)
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(
+        description="Parse LAMMPS thermo logs and build their <log>.thermo.npz caches"
+    )
+    p.add_argument("logs", nargs="+", help="log.lammps or extracted thermo files")
+    args = p.parse_args()
+    for path in args.logs:
+        runs = read_runs(path, rebuild=True)
+        print(f"{path}: {len(runs)} runs, {sum(len(r) for r in runs)} rows → {path}{CACHE_SUFFIX}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+ovito_clusters.py: shared loader for OVITO cluster-list exports
+
+OVITO's cluster analysis writes one text file per frame, `<prefix>.<frame>`,
+with “#” comment lines (the last one holding the quoted column names,
+e.g. "Cluster Identifier" "Cluster Size" "Center of Mass.X" …) followed by
+one row per cluster.  load_cluster_table() reads the whole series with a
+thread pool into one table with a `frame` column and saves it next to the
+files as `<prefix>.clusters.npz`.  The cache is reused as long as the list
+of files and their sizes/mtimes are unchanged, so re-running a script with
+another -s / -t / -n / -r does not parse the text files again.
+
+Usage from a script in this folder:
+  import ovito_clusters
+  frames, df = ovito_clusters.load_cluster_table("raw-initerior-all")
+  # frames: every frame number found (including frames without clusters)
+  # df:     one row per cluster, header columns + "frame"
+
+To build the cache ahead of time:
+  python ovito_clusters.py raw-initerior-all [--workers 16]
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+CACHE_SUFFIX  = ".clusters.npz"
+CACHE_VERSION = 1
+
+
+def cluster_files(prefix, folder="."):
+    """
+    Sorted (frame, path) of the `<prefix>.<frame>` files in folder
+    (`<prefix>_<frame>` and `<prefix><frame>` are accepted too; an
+    extension after the frame needs the `.`/`_` separator).
+    """
+    # 沒有分隔符時後面不能再接副檔名，否則 raw2.100 會被當成 raw 的第 2 幀
+    pat = re.compile(rf"{re.escape(prefix)}(?:[._](\d+)(?:\.\w+)?|(\d+))")
+    out = []
+    for fn in os.listdir(folder):
+        m = pat.fullmatch(fn)
+        if m:
+            out.append((int(m.group(1) or m.group(2)), os.path.join(folder, fn)))
+    return sorted(out)
+
+
+def read_header(path):
+    """Quoted column names of the “#” header of one export ([] if none)."""
+    names = []
+    with open(path) as f:
+        for L in f:
+            if not L.startswith("#"):
+                break
+            if '"' in L:
+                names = re.findall(r'"([^"]+)"', L)
+    return names
+
+
+def read_cluster_file(path):
+    """Rows of one export as a DataFrame with positional integer columns."""
+    try:
+        return pd.read_csv(path, sep=r"\s+", comment="#", header=None)
+    except pd.errors.EmptyDataError:
+        # 這一幀沒有任何 cluster
+        return pd.DataFrame()
+
+
+def _files_key(files):
+    h = hashlib.sha1()
+    for frame, path in files:
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+
+def _parse_series(files, workers):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        dfs = list(pool.map(read_cluster_file, [p for _, p in files]))
+    nrow = np.array([len(d) for d in dfs])
+    df = pd.concat([d for d in dfs if len(d)], ignore_index=True) if nrow.any() \
+        else pd.DataFrame()
+    df["frame"] = np.repeat([f for f, _ in files], nrow)
+    return df
+
+
+def load_cluster_table(prefix, folder=".", names=None, workers=None, rebuild=False):
+    """
+    Return (frames, df) for the export series `<folder>/<prefix>.<frame>`.
+
+    frames is the sorted array of frame numbers found; df has one row per
+    cluster, the columns named after the quoted header of the files (or
+    positionally after `names` when given) plus an int `frame` column.
+    """
+    files = cluster_files(prefix, folder)
+    frames = np.array([f for f, _ in files], dtype=np.int64)
+    key = _files_key(files)
+    side = os.path.join(folder, prefix + CACHE_SUFFIX)
+
+    df = None
+    if not rebuild and os.path.exists(side):
+        try:
+            with np.load(side, allow_pickle=False) as z:
+                if int(z["version"]) == CACHE_VERSION and str(z["key"]) == key:
+                    header = [str(c) for c in z["header"]]
+                    df = pd.DataFrame({i: z[f"col{i}"] for i in range(int(z["ncol"]))})
+                    df["frame"] = z["frame"]
+        except (OSError, KeyError, ValueError):
+            df = None
+
+    if df is None:
+        df = _parse_series(files, workers)
+        header = read_header(files[0][1]) if files else []
+        ncol = df.shape[1] - 1
+        try:
+            with open(side, "wb") as out:
+                np.savez(out, version=CACHE_VERSION, key=key, ncol=ncol,
+                         header=np.array(header, dtype=str), frame=df["frame"].to_numpy(),
+                         **{f"col{i}": df[i].to_numpy() for i in range(ncol)})
+        except OSError:
+            # 唯讀目錄：照樣用記憶體中的表
+            pass
+
+    labels = list(names) if names is not None else header
+    ncol = df.shape[1] - 1
+    df.columns = [labels[i] if i < len(labels) else i for i in range(ncol)] + ["frame"]
+    return frames, df
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(
+        description="Build the cached table of OVITO cluster-list exports"
+    )
+    p.add_argument("prefixes", nargs="+", help="Filename prefixes, e.g. raw-initerior-all")
+    p.add_argument("--workers", type=int, default=None,
+                   help="Reader threads (default: Python's ThreadPoolExecutor default)")
+    args = p.parse_args()
+    for prefix in args.prefixes:
+        frames, df = load_cluster_table(prefix, workers=args.workers, rebuild=True)
+        print(f"{prefix}: {len(frames)} files, {len(df)} clusters → {prefix}{CACHE_SUFFIX}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-import numpy as np
 import matplotlib.pyplot as plt
 import glob
 import re
+import lammps_log
 
 # **排序函數，確保數據文件順序正確**
 def natural_sort_key(text):
@@ -10,29 +10,12 @@ def natural_sort_key(text):
 # **獲取所有數據文件並排序**
 file_list = sorted(glob.glob("flibe_equil_*.txt"), key=natural_sort_key)
 
-simTime, temp, c_ex, c_in, c_PKAin, potEng, totEng = [], [], [], [], [], [], []
-change_points = []
-time_offset = 0  # 累積時間偏移
+# **讀取並合併數據文件：時間接續前一檔最後的時間**
+df = lammps_log.concat_logs(file_list, offset_column=0, how="last")
+change_points = df.attrs["offsets"][1:].tolist()  # 記錄條件變化點
 
-# **讀取數據文件**
-for idx, file in enumerate(file_list):
-    data = np.loadtxt(file, skiprows=1)
-    
-    # **計算時間偏移，使時間連續**
-    if idx > 0:
-        time_offset += simTime[-1]
-        change_points.append(time_offset)  # 記錄條件變化點
-    
-    simTime.extend(data[:, 0] + time_offset)
-    temp.extend(data[:, 4])
-    c_ex.extend(data[:, 5])
-    c_in.extend(data[:, 6])
-    c_PKAin.extend(data[:, 7])
-    potEng.extend(data[:, 8])
-    totEng.extend(data[:, 9])
-
-# **轉換為 NumPy 陣列**
-simTime, temp, c_ex, c_in, c_PKAin, potEng, totEng = map(np.array, [simTime, temp, c_ex, c_in, c_PKAin, potEng, totEng])
+simTime = df.iloc[:, 0].to_numpy()
+temp, c_ex, c_in, c_PKAin, potEng, totEng = (df.iloc[:, i].to_numpy() for i in range(4, 10))
 
 # **設置 x 軸範圍**
 x_min, x_max = simTime[0], simTime[-1]
@@ -1,9 +1,9 @@
-import numpy as np
 import matplotlib.pyplot as plt
+import lammps_log
 
 # 讀取數據
 data_file = "flibe_equil_2.txt"  # 替換成你的數據文件名稱
-data = np.loadtxt(data_file, skiprows=1)  # 跳過標題行
+data = lammps_log.read_thermo(data_file).to_numpy()  # 標題行自動略過，解析結果有快取
 
 # 提取數據列
 simTime = data[:, 0]  # 模擬時間
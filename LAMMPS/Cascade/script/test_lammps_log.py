@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Tests for lammps_log.py (run with `python -m pytest` in this folder).
+"""
+
+import numpy as np
+import lammps_log
+
+FLIBE_HEADER = "v_simTime Elapsed Dt Step Temp c_sys c_ex c_in c_PKAin PotEng TotEng Press"
+# (dt, first step, last step) of the in.FLiBe stages equil1, equil2, init, peak, final
+FLIBE_RUNS = [(0.001, 2544, 12544), (0.001, 12544, 22544), (1e-05, 22544, 42544),
+              (0.0001, 42544, 62544), (0.0001, 62544, 162544)]
+
+
+def write_flibe_log(path, prelude=True):
+    """in.FLiBe-shaped log: optional run 0 + minimize with the default header, then the stages."""
+    with open(path, "w") as f:
+        f.write("LAMMPS (2 Aug 2023)\n")
+        if prelude:
+            f.write("Step Temp E_pair E_mol TotEng Press\n")
+            f.write("0 0 -5000 0 -5000 1\n")
+            f.write("Loop time of 0.1 on 1 procs for 0 steps with 1000 atoms\n\n")
+            f.write("Step Temp E_pair E_mol TotEng Press\n")
+            for step in np.linspace(0, 2544, 12).astype(int):
+                f.write(f"{step} 0 {-5000 - step * 1e-3:.4f} 0 -5000 1\n")
+            f.write("Loop time of 1.2 on 1 procs for 2544 steps with 1000 atoms\n\n")
+        for dt, first, last in FLIBE_RUNS:
+            f.write(f"   {FLIBE_HEADER}\n")
+            for step in np.linspace(first, last, 101).astype(int):
+                t = (step - first) * dt
+                f.write(f"{t:g} {(step - first) // 2} {dt:g} {step} 1000 1 2 3 4 -5000 -4900 1\n")
+            f.write(f"Loop time of 1 on 1 procs for {last - first} steps with 1000 atoms\n\n")
+
+
+def test_stage_boundaries(tmp_path):
+    path = tmp_path / "log.lammps"
+    write_flibe_log(path, prelude=False)
+    df = lammps_log.read_thermo(str(path), cache=False)
+    assert lammps_log.stage_positions(df, "Step").tolist() == [12544, 22544, 42544, 62544]
+
+
+def test_stage_boundaries_skip_minimize_prelude(tmp_path):
+    path = tmp_path / "log.lammps"
+    write_flibe_log(path, prelude=True)
+    df = lammps_log.read_thermo(str(path), cache=False)
+    # 前面 run 0 / minimize 的 13 行沒有 Dt
+    assert df["Dt"].isna().sum() == 13
+    assert lammps_log.stage_positions(df, "Step").tolist() == [12544, 22544, 42544, 62544]
+
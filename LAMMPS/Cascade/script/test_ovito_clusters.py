@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Tests for ovito_clusters.py (run with `python -m pytest` in this folder).
+"""
+
+import ovito_clusters
+
+
+def test_cluster_files_shared_stem(tmp_path):
+    for fn in ["raw.1", "raw_100", "raw7", "raw.3.txt", "raw2.100", "raw2_5", "raw.clusters.npz"]:
+        (tmp_path / fn).write_text("")
+    frames = lambda prefix: [f for f, _ in ovito_clusters.cluster_files(prefix, str(tmp_path))]
+    # raw2.100 是 raw2 的第 100 幀，不是 raw 的第 2 幀
+    assert frames("raw") == [1, 3, 7, 100]
+    assert frames("raw2") == [5, 100]
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+thermo_stats.py: equilibration point and error bars for thermo series
+
+For every column of a thermo table (all columns at once, as one (n, m)
+array):
+
+  autocorrelation()   normalised autocorrelation function through one
+                      zero-padded FFT per column block
+  inefficiency()      statistical inefficiency g = 1 + 2 Σ ρ(t), summed up
+                      to Sokal's automatic window (t ≥ c·g); the
+                      integrated autocorrelation time is τ = (g - 1) / 2
+  equilibration()     start row t0 that maximises the number of
+                      uncorrelated samples (n - t0) / g(t0) over a grid of
+                      candidate t0 (Chodera, JCTC 12, 1799 (2016))
+  block_average()     mean of the production part and its standard error
+                      from non-overlapping blocks of ≥ 2g rows
+
+Usage from a script in this folder:
+  import lammps_log, thermo_stats
+  df = lammps_log.read_thermo("log.lammps")
+  st = thermo_stats.analyze(df, ["Temp", "Density"])
+  # st.loc["Density", ["t0", "x0", "g", "mean", "sem", "block_mean", "block_sem"]]
+
+Many logs in one go (one row per log and column):
+  python thermo_stats.py log-*.txt -c Temp Density PotEng -o thermo_stats.csv
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import fft
+
+# 這些欄位是時間軸，不做統計
+AXIS_COLUMNS = {"step", "elapsed", "dt", "v_simtime", "time", "convert_simtime"}
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=float)
+    return x.reshape(len(x), -1)
+
+
+def autocorrelation(x):
+    """
+    Normalised autocorrelation ρ(t), t = 0…n-1, of each column of x
+    (n,) or (n, m); constant columns give ρ = [1, 0, 0, …].
+    """
+    x = _as_2d(x)
+    n = len(x)
+    d = x - x.mean(axis=0)
+    nfft = fft.next_fast_len(2 * n - 1, real=True)
+    f = fft.rfft(d, n=nfft, axis=0, workers=-1)
+    acf = fft.irfft(f * f.conj(), n=nfft, axis=0, workers=-1)[:n]
+    var = acf[0].copy()
+    flat = var <= 0
+    var[flat] = 1.0
+    acf /= var
+    acf[:, flat] = 0.0
+    acf[0] = 1.0
+    return acf
+
+
+def inefficiency(x, c=5.0):
+    """Statistical inefficiency g ≥ 1 of each column (Sokal window with constant c)."""
+    acf = autocorrelation(x)
+    n = len(acf)
+    g = 2.0 * np.cumsum(acf, axis=0) - 1.0
+    # 第一個滿足 M ≥ c·g(M) 的 M；都不滿足就用整段
+    ok = np.arange(n)[:, None] >= c * g
+    m = np.where(ok.any(axis=0), ok.argmax(axis=0), n - 1)
+    return np.maximum(g[m, np.arange(g.shape[1])], 1.0)
+
+
+def equilibration(x, ncand=50, max_frac=0.75, c=5.0):
+    """
+    Equilibration row t0, inefficiency g of x[t0:] and the effective
+    sample count (n - t0) / g for each column, t0 chosen among ncand
+    evenly spaced candidates in [0, max_frac·n).
+    """
+    x = _as_2d(x)
+    n, m = x.shape
+    cand = np.unique(np.linspace(0, max_frac * n, ncand, endpoint=False).astype(int))
+    cand = cand[n - cand >= 4] if n >= 4 else cand[:1]
+    g = np.vstack([inefficiency(x[t0:], c) for t0 in cand])
+    neff = (n - cand)[:, None] / g
+    best = neff.argmax(axis=0)
+    cols = np.arange(m)
+    return cand[best], g[best, cols], neff[best, cols]
+
+
+def block_average(x, block):
+    """
+    Mean and standard error of each column of x from non-overlapping
+    blocks; block is one size or one size per column.  Columns with
+    fewer than two blocks get sem = NaN.
+    """
+    x = _as_2d(x)
+    n, m = x.shape
+    block = np.broadcast_to(np.maximum(np.asarray(block, dtype=int), 1), (m,))
+    mean = np.full(m, np.nan)
+    sem = np.full(m, np.nan)
+    # 同一個 block 大小的欄位一起 reshape
+    for b in np.unique(block):
+        cols = np.nonzero(block == b)[0]
+        nb = n // b
+        if nb == 0:
+            continue
+        means = x[:nb * b, cols].reshape(nb, b, len(cols)).mean(axis=1)
+        mean[cols] = means.mean(axis=0)
+        if nb >= 2:
+            sem[cols] = means.std(axis=0, ddof=1) / np.sqrt(nb)
+    return mean, sem
+
+
+def analyze(df, columns=None, x="Step", ncand=50, max_frac=0.75, c=5.0):
+    """
+    One row per analysed column of the thermo table df:
+
+      n           rows used (rows with NaN in any column are dropped)
+      t0, x0      equilibration row and the value of column x there
+      g, tau      statistical inefficiency and integrated autocorrelation
+                  time (samples) of the production part x[t0:]
+      n_eff       (n - t0) / g
+      mean, sem   production mean and its error sqrt(var·g / (n - t0))
+      block, block_mean, block_sem
+                  block size (⌈2g⌉ rows) and the block-averaged estimate
+
+    Columns default to all numeric columns except the time-axis ones.
+    """
+    if columns is None:
+        columns = [col for col in df.columns
+                   if str(col).lower() not in AXIS_COLUMNS and col != "source_file"
+                   and np.issubdtype(df[col].dtype, np.number)]
+    data = df[list(columns)].to_numpy(dtype=float)
+    keep = np.isfinite(data).all(axis=1)
+    data = data[keep]
+    xs = df[x].to_numpy()[keep] if x in df.columns else np.arange(len(data))
+    n = len(data)
+    if n < 4:
+        raise ValueError(f"only {n} complete rows, too short for statistics")
+
+    t0, g, neff = equilibration(data, ncand, max_frac, c)
+    prod_len = n - t0
+    mean = np.empty(len(columns))
+    var = np.empty(len(columns))
+    bmean = np.empty(len(columns))
+    bsem = np.empty(len(columns))
+    block = np.ceil(2 * g).astype(int)
+    # 依 t0 分組，同一段 production 的欄位一起算
+    for s in np.unique(t0):
+        cols = np.nonzero(t0 == s)[0]
+        prod = data[s:, cols]
+        mean[cols] = prod.mean(axis=0)
+        var[cols] = prod.var(axis=0, ddof=1)
+        bmean[cols], bsem[cols] = block_average(prod, block[cols])
+
+    return pd.DataFrame({
+        "n": n, "t0": t0, "x0": xs[t0], "g": g, "tau": (g - 1) / 2, "n_eff": neff,
+        "mean": mean, "sem": np.sqrt(var * g / prod_len),
+        "block": block, "block_mean": bmean, "block_sem": bsem,
+    }, index=pd.Index(list(columns), name="column"))
+
+
+def analyze_logs(paths, columns=None, x="Step", **kw):
+    """analyze() for each log (read through lammps_log), stacked with a `file` column."""
+    import lammps_log
+    out = []
+    for path in paths:
+        try:
+            st = analyze(lammps_log.read_thermo(path), columns, x, **kw)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"{path}: skipped ({e})")
+            continue
+        out.append(st.reset_index().assign(file=path))
+    if not out:
+        return pd.DataFrame()
+    df = pd.concat(out, ignore_index=True)
+    return df[["file"] + [col for col in df.columns if col != "file"]]
+
+
+def main():
+    import argparse
+    p = argparse.ArgumentParser(
+        description="Equilibration point, autocorrelation time and block-averaged "
+                    "means of LAMMPS thermo columns"
+    )
+    p.add_argument("logs", nargs="+", help="log.lammps or extracted thermo files")
+    p.add_argument("-c", "--columns", nargs="+", default=None,
+                   help="Columns to analyse (default: all but the time-axis columns)")
+    p.add_argument("-x", "--xaxis", default="Step",
+                   help="Column reported as x0 at the equilibration row (default: Step)")
+    p.add_argument("-o", "--output", default="thermo_stats.csv", help="Output CSV")
+    args = p.parse_args()
+
+    st = analyze_logs(args.logs, args.columns, args.xaxis)
+    if st.empty:
+        print("No log could be analysed.")
+        return
+    st.to_csv(args.output, index=False)
+    with pd.option_context("display.width", 160, "display.max_rows", 200):
+        print(st[["file", "column", "x0", "tau", "n_eff", "block_mean", "block_sem"]])
+    print(f"saved → {args.output}")
+
+
+if __name__ == "__main__":
+    main()
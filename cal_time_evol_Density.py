@@ -1,46 +1,41 @@
 # thermo_style    custom step temp press vol density ; input file in.lammps
-import numpy as np
 import matplotlib.pyplot as plt
+import cascade_path
+import lammps_log
+import thermo_stats
+
+def production_block(file_path):
+    # read_thermo would glue every run together, including the run 0 / minimize
+    # blocks in front (no Density column, NaN there); keep the last run that
+    # prints Density, which is the production run of in.lammps
+    runs = [r for r in lammps_log.read_runs(file_path, columns=lammps_log.THERMO_COLUMNS)
+            if "Density" in r.columns]
+    if not runs:
+        raise ValueError(f"{file_path}: no thermo block with a Density column")
+    df = runs[-1]
+    return df[df["Density"].notna()].reset_index(drop=True)
 
 def parse_log_lammps(file_path):
-
-    timesteps = []
-    temperatures = []
-    pressures = []
-    volumes = []
-    densities = []
-
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
-
-    # skip the first 212 lines, until this line is reached:
-    # Step          Temp          Press          Volume        Density
-
-    lines = lines[212:]
-
-    for line in lines:
-        # check for numerical lines, and skip column headers lines and non-numerical lines
-        parts = line.strip().split()
-        if parts and parts[0].isdigit():  # check if the first part is a digit
-            try:
-                timestep = int(parts[0])
-                temperature = float(parts[1])
-                pressure = float(parts[2])
-                volume = float(parts[3])
-                density = float(parts[4])
-                timesteps.append(timestep)
-                temperatures.append(temperature)
-                pressures.append(pressure)
-                volumes.append(volume)
-                densities.append(density)
-            except ValueError:
-                # skip lines that cannot be converted to float
-                continue
-
-    return (np.array(timesteps), np.array(temperatures), np.array(pressures), 
-            np.array(volumes), np.array(densities))
-
-def plot_density_evolution(timesteps, temperatures, pressures, volumes, densities, output_file):
+    # the thermo block of every run (from the "Step Temp Press Volume Density"
+    # header to "Loop time") is located by the parser, no lines to skip by hand
+    df = production_block(file_path)
+    return tuple(df[c].to_numpy() for c in ("Step", "Temp", "Press", "Volume", "Density"))
+
+def equilibration_stats(file_path, output_csv):
+    # equilibration step, autocorrelation time and block-averaged mean +- error
+    # of each column over the production part (log is cached, read again cheaply)
+    stats = thermo_stats.analyze(production_block(file_path),
+                                 ["Temp", "Press", "Volume", "Density"])
+    stats.to_csv(output_csv)
+    print(stats[["x0", "tau", "n_eff", "block_mean", "block_sem"]])
+    return stats
+
+def mark_production(stats, column):
+    # start of the production window and its mean
+    plt.axvline(stats.at[column, "x0"], color="k", linestyle="--", linewidth=0.8)
+    plt.axhline(stats.at[column, "block_mean"], color="k", linestyle=":", linewidth=0.8)
+
+def plot_density_evolution(timesteps, temperatures, pressures, volumes, densities, output_file, stats=None):
 
     plt.figure(figsize=(10, 8))
 
@@ -49,6 +44,8 @@ def plot_density_evolution(timesteps, temperatures, pressures, volumes, densitie
     plt.plot(timesteps, temperatures, marker="o", linestyle="-", color="r", label="Temperature (K)")
     plt.xlabel("Time-step")
     plt.ylabel("Temperature (K)")
+    if stats is not None:
+        mark_production(stats, "Temp")
     plt.title("Temperature Evolution")
     plt.legend()
 
@@ -57,6 +54,8 @@ def plot_density_evolution(timesteps, temperatures, pressures, volumes, densitie
     plt.plot(timesteps, pressures, marker="o", linestyle="-", color="g", label="Pressure (atm)")
     plt.xlabel("Time-step")
     plt.ylabel("Pressure (atm)")
+    if stats is not None:
+        mark_production(stats, "Press")
     plt.title("Pressure Evolution")
     plt.legend()
 
@@ -65,6 +64,8 @@ def plot_density_evolution(timesteps, temperatures, pressures, volumes, densitie
     plt.plot(timesteps, volumes, marker="o", linestyle="-", color="b", label="Volume (Å³)")
     plt.xlabel("Time-step")
     plt.ylabel("Volume (Å³)")
+    if stats is not None:
+        mark_production(stats, "Volume")
     plt.title("Volume Evolution")
     plt.legend()
 
@@ -73,6 +74,8 @@ def plot_density_evolution(timesteps, temperatures, pressures, volumes, densitie
     plt.plot(timesteps, densities, marker="o", linestyle="-", color="m", label="Density (g/cm³)")
     plt.xlabel("Time-step")
     plt.ylabel("Density (g/cm³)")
+    if stats is not None:
+        mark_production(stats, "Density")
     plt.title("Density Evolution")
     plt.legend()
 
@@ -82,6 +85,8 @@ def plot_density_evolution(timesteps, temperatures, pressures, volumes, densitie
 
 log_file = "log.lammps" 
 output_image = "evolution_log.png"
+output_stats = "evolution_stats.csv"
 
 timesteps, temperatures, pressures, volumes, densities = parse_log_lammps(log_file)
-plot_density_evolution(timesteps, temperatures, pressures, volumes, densities, output_image)
\ No newline at end of file
+stats = equilibration_stats(log_file, output_stats)
+plot_density_evolution(timesteps, temperatures, pressures, volumes, densities, output_image, stats)
\ No newline at end of file
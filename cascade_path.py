@@ -0,0 +1,13 @@
+"""
+Puts LAMMPS/Cascade/script/ (lammps_log, lammps_dump, thermo_stats, ...) on
+sys.path, so the root scripts can import those helpers from any working
+directory: `import cascade_path` before importing them.
+"""
+
+import os
+import sys
+
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "LAMMPS", "Cascade", "script")
+
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
@@ -1,12 +1,32 @@
 import dpdata
-import numpy as np
+import cascade_path
+import lammps_dump
 
-lammpstrj_file = "conf.dump"  
-output_poscar = "POSCAR" 
+lammpstrj_file = "conf.dump"   # 也可以是 conf.dump.gz / .xz / .zst
+output_poscar = "POSCAR"
 
-system = dpdata.System(lammpstrj_file, fmt='lammps/dump', type_map=["Zr", "H"])
+def read_first_frame(fname):
+    """
+    Text lines of the first frame of a (compressed) dump; lammps_dump
+    decompresses it as a stream and reading stops at the second
+    “ITEM: TIMESTEP”.
+    """
+    lines = []
+    with lammps_dump.open_dump(fname) as f:
+        for line in f:
+            line = line.decode()
+            if line.startswith("ITEM: TIMESTEP") and lines:
+                break
+            lines.append(line.rstrip("\n"))
+    return lines
+
+if lammps_dump.dump_codec(lammpstrj_file) is not None:
+    # POSCAR 只寫第一帧，所以只解壓第一帧
+    data = dpdata.lammps.dump.system_data(read_first_frame(lammpstrj_file), type_map=["Zr", "H"])
+    system = dpdata.System(data=data)
+else:
+    system = dpdata.System(lammpstrj_file, fmt='lammps/dump', type_map=["Zr", "H"])
 
 system.to_vasp_poscar(output_poscar, coord_sys='Cartesian')
 
 print(f"The POSCAR file has been written to {output_poscar}")
-
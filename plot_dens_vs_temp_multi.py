@@ -16,36 +16,32 @@ python plot_dens_vs_temp_multi.py \
   -o dens_vs_temp_comparison.pdf
 
   Each `-i` must be followed by a `-l`.
+
+With --stats the production mean of Temp and Density of each log (after the
+equilibration point found by thermo_stats) is printed and drawn with its
+block-averaged standard error.
 """
 
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
+import cascade_path
+import lammps_log
+import thermo_stats
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Plot multiple Density vs Temperature curves from LAMMPS logs.")
     parser.add_argument('-i', '--input', action='append', required=True, help='Input log file')
     parser.add_argument('-l', '--label', action='append', required=True, help='Label for the dataset')
-    parser.add_argument('-s', '--header-skip', type=int, default=0, help='Number of lines to skip')
+    parser.add_argument('-s', '--header-skip', type=int, default=0, help='Lines to skip first (thermo headers are detected, usually not needed)')
     parser.add_argument('-t', '--dt', type=float, default=0.0005, help='Timestep to ps conversion (default: 0.0005)')
+    parser.add_argument('--stats', action='store_true', help='Print and plot the production mean ± SE of Temp and Density')
     parser.add_argument('-o', '--output', default='figure-dens_vs_temp_multi.pdf', help='Output figure file')
     return parser.parse_args()
 
 def parse_log_lammps(path, header_skip):
-    steps, temps, dens = [], [], []
-    with open(path) as f:
-        lines = f.readlines()[header_skip:]
-    for line in lines:
-        parts = line.strip().split()
-        if len(parts) < 5 or not parts[0].isdigit():
-            continue
-        try:
-            steps.append(int(parts[0]))
-            temps.append(float(parts[1]))
-            dens.append(float(parts[4]))
-        except ValueError:
-            continue
-    return np.array(steps), np.array(temps), np.array(dens)
+    df = lammps_log.read_thermo(path, columns=lammps_log.THERMO_COLUMNS, skip_lines=header_skip)
+    return tuple(df[c].to_numpy() for c in ("Step", "Temp", "Density"))
 
 def main():
     args = parse_args()
@@ -72,6 +68,15 @@ def main():
         steps, temps, dens = parse_log_lammps(log_file, args.header_skip)
         color = color_cycle[idx % len(color_cycle)]
         plt.plot(temps, dens, label=label, linewidth=1.5, color=color)
+        if args.stats:
+            # 平衡點之後的 production 平均與 block 誤差
+            st = thermo_stats.analyze(lammps_log.read_thermo(log_file, columns=lammps_log.THERMO_COLUMNS, skip_lines=args.header_skip),
+                                      ["Temp", "Density"])
+            T, D = st.loc["Temp"], st.loc["Density"]
+            print(f"{label}: Step ≥ {D['x0']:.0f}  T = {T['block_mean']:.2f} ± {T['block_sem']:.2f} K  "
+                  f"ρ = {D['block_mean']:.5f} ± {D['block_sem']:.5f} g/cm³  (τ_ρ = {D['tau']:.1f} rows)")
+            plt.errorbar(T['block_mean'], D['block_mean'], xerr=T['block_sem'], yerr=D['block_sem'],
+                         fmt='*', markersize=12, capsize=4, color=color, markeredgecolor='black', zorder=11)
 
     # Comparison datasets
     comparison_data = {
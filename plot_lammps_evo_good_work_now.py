@@ -24,20 +24,24 @@ CLI Usage Examples:
     Arguments:
 ----------
 -i / --input         : Input log file (default: data.log)
--s / --header-skip   : Number of header lines to skip (default: 0)
+-s / --header-skip   : Lines to skip first (default: 0; thermo headers are detected)
 -t / --dt            : Timestep to ps conversion factor (default: 0.0005)
 -o / --output        : Output filename for full time evolution plot
 -l / --plot-log      : Enable log-scale plot of step
 -L / --step-output   : Output filename for log(step) plot
 -a / --appear        : Choose specific quantities to plot separately (temp, press, vol, dens)
 --ps                 : Use physical time (ps) instead of step as X-axis
+--follow             : Keep the log open while LAMMPS is running, parse only
+                       newly appended thermo rows and refresh the figures
+--poll               : Seconds between checks with --follow (default: 30)
 
 """
 
 import argparse
-import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
+import cascade_path
+import lammps_log
 
 plt.rcParams.update({
     'font.family': 'Times New Roman',
@@ -55,7 +59,7 @@ plt.tick_params(axis='both', direction='in')
 def parse_args():
     parser = argparse.ArgumentParser(description="繪製 LAMMPS log 資料的時間演化圖")
     parser.add_argument("-i", "--input", default="data.log", help="LAMMPS log 檔案")
-    parser.add_argument("-s", "--header-skip", type=int, default=0, help="跳過 header 行數")
+    parser.add_argument("-s", "--header-skip", type=int, default=0, help="先跳過開頭幾行（thermo 標頭會自動偵測）")
     parser.add_argument("-t", "--dt", type=float, default=0.0005, help="每一步對應的物理時間 (ps)")
     parser.add_argument("-o", "--output", default="fig_evolution_time.pdf", help="總圖輸出檔名")
     parser.add_argument("-l", "--plot-log", action="store_true", help="是否畫 log(step) 圖")
@@ -63,30 +67,16 @@ def parse_args():
     parser.add_argument("-a", "--appear", nargs="+", choices=["temp", "press", "vol", "dens", "pe", "ke", "etot"],
                         help="選擇繪製哪些欄位（單獨成圖）")
     parser.add_argument("--ps", action="store_true", help="橫軸使用時間 (ps) 而非 step")
+    parser.add_argument("--follow", action="store_true", help="跟隨仍在寫入的 log，只解析新增的行並刷新圖")
+    parser.add_argument("--poll", type=float, default=30.0, help="--follow 時每次檢查間隔秒數")
     return parser.parse_args()
 
+def thermo_arrays(df):
+    """Step Temp Press Volume Density PotEng KinEng TotEng columns as arrays."""
+    return tuple(df[c].to_numpy() for c in lammps_log.THERMO_COLUMNS)
+
 def parse_log_lammps(path, header_skip):
-    steps, temps, press, vols, dens, pes, kes, etots = [], [], [], [], [], [], [], []
-    with open(path) as f:
-        lines = f.readlines()[header_skip:]
-    for line in lines:
-        parts = line.strip().split()
-        if len(parts) < 8 or not parts[0].isdigit():
-            continue
-        try:
-            steps.append(int(parts[0]))
-            temps.append(float(parts[1]))
-            press.append(float(parts[2]))
-            vols.append(float(parts[3]))
-            dens.append(float(parts[4]))
-            pes.append(float(parts[5]))
-            kes.append(float(parts[6]))
-            etots.append(float(parts[7]))
-        except ValueError:
-            continue
-    return (np.array(steps), np.array(temps), np.array(press),
-            np.array(vols), np.array(dens), np.array(pes),
-            np.array(kes), np.array(etots))
+    return thermo_arrays(lammps_log.read_thermo(path, lammps_log.THERMO_COLUMNS, header_skip))
 
 def plot_single(fig_name, x, y, xlabel, ylabel, title, color):
     plt.figure()
@@ -114,10 +104,7 @@ def plot_step_log_evolution(steps, data_map, out_png, color_map):
     plt.savefig(out_png, dpi=900, bbox_inches='tight')
     plt.close(fig)
 
-if __name__ == "__main__":
-    args = parse_args()
-    steps, temps, press, vols, dens, pes, kes, etots = parse_log_lammps(args.input, args.header_skip)
-
+def make_plots(args, steps, temps, press, vols, dens, pes, kes, etots):
     if args.ps:
         x = steps * args.dt
         x_label = "Time (ps)"
@@ -160,3 +147,20 @@ if __name__ == "__main__":
 
     if args.plot_log:
         plot_step_log_evolution(steps, {key: data_map[key] for key in keys_to_plot}, args.step_output, color_map)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.follow:
+        # 跟隨模式：有新的 thermo 行才重畫
+        parts = []
+        try:
+            for new_rows in lammps_log.follow_thermo(args.input, args.poll,
+                                                     lammps_log.THERMO_COLUMNS, args.header_skip):
+                parts.append(new_rows)
+                df = lammps_log.concat_runs(parts, lammps_log.THERMO_COLUMNS)
+                make_plots(args, *thermo_arrays(df))
+                print(f"[follow] {len(df)} thermo rows, last step {df['Step'].iat[-1]}")
+        except KeyboardInterrupt:
+            pass
+    else:
+        make_plots(args, *parse_log_lammps(args.input, args.header_skip))
@@ -1,7 +1,8 @@
 # python plot.py -i data.log  -l 
-import numpy as np
 import matplotlib.pyplot as plt
 import argparse
+import cascade_path
+import lammps_log
 
 def parse_args():
     p = argparse.ArgumentParser(
@@ -10,7 +11,7 @@ def parse_args():
     p.add_argument("-i", "--input",   default="log.lammps",
                    help="LAMMPS log 檔案")
     p.add_argument("-s", "--header-skip", type=int, default=0,
-                   help="跳過幾行標頭（header）")
+                   help="先跳過開頭幾行（thermo 標頭會自動偵測，通常不需要）")
     p.add_argument("-t", "--dt",     type=float, default=0.0005,
                    help="每一步對應的真實時間 (ps)，預設 0.0005 ps")
     p.add_argument("-o", "--output",  default="evolution_time.pdf",
@@ -22,25 +23,8 @@ def parse_args():
     return p.parse_args()
 
 def parse_log_lammps(path, header_skip):
-    steps, temps, press, vols, dens = [], [], [], [], []
-    with open(path) as f:
-        lines = f.readlines()[header_skip:]
-    for line in lines:
-        parts = line.strip().split()
-        if not parts or not parts[0].isdigit(): continue
-        try:
-            steps.append(int(parts[0]))
-            temps.append(float(parts[1]))
-            press.append(float(parts[2]))
-            vols.append(float(parts[3]))
-            dens.append(float(parts[4]))
-        except ValueError:
-            continue
-    return (np.array(steps), 
-            np.array(temps), 
-            np.array(press), 
-            np.array(vols), 
-            np.array(dens))
+    df = lammps_log.read_thermo(path, columns=lammps_log.THERMO_COLUMNS, skip_lines=header_skip)
+    return tuple(df[c].to_numpy() for c in ("Step", "Temp", "Press", "Volume", "Density"))
 
 def plot_time_evolution(steps, temps, press, vols, dens, dt, out_png):
     times = steps * dt  # ps
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import numpy as np
 import matplotlib.pyplot as plt
 import argparse
+import cascade_path
+import lammps_log
 
 def parse_args():
     p = argparse.ArgumentParser(
@@ -15,7 +16,7 @@ def parse_args():
     )
     p.add_argument(
         "-s", "--header-skip", type=int, default=0,
-        help="Number of lines to skip at the top of the file"
+        help="Lines to skip at the top of the file first (thermo headers are detected, usually not needed)"
     )
     p.add_argument(
         "-t", "--dt", type=float, default=0.0005,
@@ -36,25 +37,8 @@ def parse_args():
     return p.parse_args()
 
 def parse_log(path, header_skip):
-    steps, poteng, kineng, toteng = [], [], [], []
-    with open(path) as f:
-        lines = f.readlines()[header_skip:]
-    for line in lines:
-        parts = line.strip().split()
-        if not parts or not parts[0].isdigit():
-            continue
-        # 格式: Step Temp Press Volume Density PotEng KinEng TotEng
-        try:
-            steps.append(int(parts[0]))
-            poteng.append(float(parts[5]))
-            kineng.append(float(parts[6]))
-            toteng.append(float(parts[7]))
-        except (IndexError, ValueError):
-            continue
-    return (np.array(steps),
-            np.array(poteng),
-            np.array(kineng),
-            np.array(toteng))
+    df = lammps_log.read_thermo(path, columns=lammps_log.THERMO_COLUMNS, skip_lines=header_skip)
+    return tuple(df[c].to_numpy() for c in ("Step", "PotEng", "KinEng", "TotEng"))
 
 def plot_time(steps, pot, kin, tot, dt, out_png):
     times = steps * dt
@@ -90,7 +74,7 @@ if __name__ == "__main__":
     args = parse_args()
     steps, pot, kin, tot = parse_log(args.input, args.header_skip)
     if len(steps) == 0:
-        print("❌ No data parsed. Check your header-skip or log format.")
+        print("❌ No data parsed. Check the log format.")
         exit(1)
 
     # 1) 绘制时间演化